@@ -1,633 +1,912 @@
 import os
-from database import find_schema
-
-
-def create_dto(model_path_dir: str, dto_root_path: str):
-    for root, dirs, files in os.walk(model_path_dir):
-        # print(f"length of files: {len(files)}")
-        for file in files:
-
-            with open(os.path.join(root, file)) as domain_file:
-                filename, file_extension = os.path.splitext(file)
-                dto_name = filename + 'DTO' + file_extension
-
-                schema = find_schema(filename)
-                if schema == -1:
-                    print('file name: ', filename, ', schema: ', schema)
-                    continue
-
-                if not os.path.exists(os.path.join(dto_root_path, schema)):
-                    os.mkdir(os.path.join(dto_root_path, schema))
-
-                with open(os.path.join(dto_root_path, schema, dto_name), 'w+') as dto_file:
-                    for line in domain_file:
-                        if "namespace" in line:
-                            line = f"namespace CNET_V7_Domain.DataModels.{schema}Schema;\n"
-                        if "class" in line:
-                            line = line.split('\n')[:-1][0] + 'DTO'
-                        if "virtual" in line:
-                            continue
-                        if line.isspace():
-                            continue
-                        dto_file.write(line)
-    print(f"All DTOS Created")
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from catalog import ModelCatalog, ModelEntry, as_catalog, build_catalog
+from manifest import GENERATOR_VERSION, Manifest, content_hash
+from options import get_option, options_key
+from output import ENCODING, FileSystemOutput
+from run_stats import get_stats
+from template_engine import get_template
 
-def create_irepositories(model_path_dir: str, irepository_path_dir):
-    irepository_sample = '''
-using CNET_V7_Entities.DataModels;
-using System;
-using System.Collections.Generic;
-using System.Linq;
-using System.Text;
-using System.Threading.Tasks;
 
-namespace CNET_V7_Repository.Contracts.SchemaNameSchema
-{
-    public interface IEntityNameRepository : IRepository<SafeName>
-    {
+def create_dto(models, dto_root_path: str, incremental: bool = False, workers: int = 0, output=None):
+    _write_per_model(as_catalog(models), dto_root_path, 'dto', *_dto_files(), incremental, workers, output)
+    print(f"All DTOS Created")
 
-    }
-}
-    '''
-    schema = 'NotFound'
-
-    for root, dirs, files in os.walk(model_path_dir):
-        filenames = [os.path.splitext(file)[0] for file in files]
-        # print(filenames)
-        for name in filenames:
-            schema = find_schema(name)
-
-            if not os.path.exists(os.path.join(irepository_path_dir, schema)):
-                os.mkdir(os.path.join(irepository_path_dir, schema))
-
-            repo_name = 'I' + name + 'Repository'
-            with open(os.path.join(irepository_path_dir, schema, repo_name + '.cs'), 'w+') as file:
-                # let me replace it
-                safe_model_name = name
-                if name.lower() in ['delegate', 'range', 'route']:
-                    safe_model_name = f'CNET_V7_Entities.DataModels.{name}'
-
-                file.write(irepository_sample.replace('EntityName', name).replace('SchemaName', schema).replace(
-                    'SafeName', safe_model_name))
+
+def _dto_files():
+    template = get_template('dto')
+
+    def render(model):
+        entity = model.entity
+        if entity.class_name is None:
+            raise ValueError(f"no entity class found in {model.source_path}")
+        properties = []
+        # navigations are left out, a DTO only carries the columns
+        for entity_property in entity.scalar_properties:
+            lines = entity_property.comments + entity_property.attributes
+            declaration = f"{_modifiers(entity_property.modifiers)}{entity_property.type} {entity_property.name} " \
+                          f"{entity_property.accessors}"
+            if entity_property.initializer is not None:
+                declaration += f" = {entity_property.initializer};"
+            properties.append(''.join(f'    {line}\n' for line in lines + [declaration]))
+        return template.render(
+            _model_values(model),
+            USING_STATEMENTS=''.join(line + '\n' for line in entity.header),
+            CLASS_ATTRIBUTES=''.join(line + '\n' for line in entity.class_comments + entity.class_attributes),
+            CLASS_MODIFIERS=_modifiers(entity.class_modifiers),
+            PROPERTIES='\n'.join(properties))
+
+    return lambda model: model.name + 'DTO.cs', render, template.source
+
+
+def _modifiers(modifiers: list) -> str:
+    # with its separator, so a declaration without modifiers doesn't start with a space
+    return ''.join(modifier + ' ' for modifier in modifiers)
+
+
+def create_irepositories(models, irepository_path_dir: str, incremental: bool = False, workers: int = 0, output=None):
+    _write_per_model(as_catalog(models), irepository_path_dir, 'irepository', *_irepository_files(),
+                     incremental, workers, output)
     print(" All Irepository Files Are Created")
 
 
-def create_irepository_manager(model_path_dir: str, irepository_manger_file_path: str):
-    implementation_sample = '''
-THE_USING_STATEMENT
-using System;
-using System.Collections.Generic;
-using System.Linq;
-using System.Text;
-using System.Threading.Tasks;
-
-namespace CNET_V7_Repository.Contracts
-{
-    public interface IRepositoryManager
-    {
-        void Save();
-        THE_DECLARATION
-    }
-}
-    '''
-    using_statement = ''
-    the_declaration = ''
-    using_printed_schemas = []
-    with open(irepository_manger_file_path, 'w+') as manager:
-        for root, dirs, files in os.walk(model_path_dir):
-            for file in files:
-                model_name, file_extension = os.path.splitext(file)
-                the_declaration += f'\n\t\tI{model_name}Repository {model_name} ' + '{ get; }\n'
-
-                if find_schema(model_name) not in using_printed_schemas:
-                    using_printed_schemas.append(find_schema(model_name))
-                    using_statement += f'using CNET_V7_Repository.Contracts.{find_schema(model_name)}Schema;\n'
-
-            manager.write(
-                implementation_sample.replace('THE_USING_STATEMENT', using_statement).replace('THE_DECLARATION',
-                                                                                              the_declaration))
+def _irepository_files():
+    template = get_template('irepository')
+    return lambda model: 'I' + model.name + 'Repository.cs', \
+        lambda model: template.render(_extended_values(model, 'irepository', _model_values(model))), \
+        _extended_source(template, 'irepository')
 
-    print(f"Irepository manager created")
 
+def create_irepository_manager(models, irepository_manger_file_path: str, incremental: bool = False, output=None):
+    catalog = as_catalog(models)
+    if get_option('split_aggregates'):
+        def render_schema(schema_models):
+            return ''.join(f'        I{model.name}Repository {model.name} ' + '{ get; }\n' for model in schema_models)
 
-def create_irepository_implementation(model_path_dir: str, irepository_implementation_root: str):
-    implementation_sample = '''
-using CNET_V7_Repository.Contracts;
-using Microsoft.Identity.Client;
-using System;
-using System.Collections.Generic;
-using System.Linq;
-using System.Text;
-using System.Threading.Tasks;
-using CNET_V7_Entities.DataModels;
-using CNET_V7_Repository.Contracts.SCHEMA_NAMESchema;
-using Microsoft.EntityFrameworkCore;
-using CNET_V7_Entities.Data;
-
-namespace CNET_V7_Repository.Implementation.SCHEMA_NAMESchema
-{
-    public class MODEL_NAMERepository : Repository<SAFE_MODEL_NAME>, IMODEL_NAMERepository
-    {
-        public MODEL_NAMERepository(CnetV7DbContext context) : base(context)
-        {
-        }
-    }
-}
+        _write_split_aggregate(catalog, irepository_manger_file_path, 'irepository_manager', render_schema, None,
+                               incremental, output)
+        print(f"Irepository manager created")
+        return
 
-        '''
+    template = get_template('irepository_manager')
 
-    for root, dirs, files in os.walk(model_path_dir):
-        filenames = [os.path.splitext(file)[0] for file in files]
-        # print(filenames)
-        for name in filenames:
-            schema = find_schema(name)
+    def render(catalog):
+        using_statement = ''.join(f'using CNET_V7_Repository.Contracts.{schema}Schema;\n'
+                                  for schema in catalog.schemas)
+        the_declaration = ''.join(f'\n\t\tI{model.name}Repository {model.name} ' + '{ get; }\n'
+                                  for model in catalog)
+        return template.render(USING_STATEMENTS=using_statement, DECLARATIONS=the_declaration)
 
-            if not os.path.exists(os.path.join(irepository_implementation_root, schema)):
-                os.mkdir(os.path.join(irepository_implementation_root, schema))
+    _write_aggregate(catalog, irepository_manger_file_path, 'irepository_manager', render, template.source,
+                     incremental, output)
+    print(f"Irepository manager created")
 
-            # repo_name = 'I' + name + 'Repository'
-            with open(os.path.join(irepository_implementation_root, schema, name + 'Repository.cs'), 'w+') as file:
-                # let me replace it
-                safe_model_name = name
-                if name.lower() in ['delegate', 'range', 'route']:
-                    safe_model_name = f'CNET_V7_Entities.DataModels.{name}'
 
-                file.write(
-                    implementation_sample.replace('SAFE_MODEL_NAME', safe_model_name).replace('MODEL_NAME',
-                                                                                              name).replace(
-                        "SCHEMA_NAME", schema))
+def create_irepository_implementation(models, irepository_implementation_root: str, incremental: bool = False,
+                                      workers: int = 0, output=None):
+    _write_per_model(as_catalog(models), irepository_implementation_root, 'repository', *_repository_files(),
+                     incremental, workers, output)
     print(" All Repository Implementation Files Are Created")
 
 
-def create_repository_manager(model_path_dir: str, repository_manager_file_path: str):
-    repository_manager_design = '''
-using CNET_V7_Entities.Data;
-using CNET_V7_Repository.Contracts;
-THE_USING_STATEMENT
-using System;
-using System.Collections.Generic;
-using System.Linq;
-using System.Text;
-using System.Threading.Tasks;
-
-namespace CNET_V7_Repository.Implementation
-{
-    public class RepositoryManager : IRepositoryManager
-    {
-        private readonly CnetV7DbContext _repositoryContext;
-
-        THE_LAZY_DECLARATION
-
-        public RepositoryManager(CnetV7DbContext repositoryContext)
-        {
-            _repositoryContext = repositoryContext;
-            THE_LAZY_CTOR
-        }
-
-        public void Save() => _repositoryContext.SaveChanges();
-        THE_LAZY_INSTANTIATION
-    }
-}
-    '''
-    the_using_statement = ''
-    the_lazy_declaration = ''
-    the_lazy_ctor = ''
-    the_lazy_instantiation = ''
-
-    using_printed_schemas = []
-    with open(repository_manager_file_path, 'w+') as repository_manager:
-        for root, dirs, files in os.walk(model_path_dir):
-            for file in files:
-                model_name, file_extension = os.path.splitext(file)
-                schema = find_schema(model_name)
-                if schema not in using_printed_schemas:
-                    using_printed_schemas.append(schema)
-                    the_using_statement += f'using CNET_V7_Repository.Contracts.{schema}Schema;\nusing CNET_V7_Repository.Implementation.{schema}Schema;\n'
-                if schema == -1:
-                    print("schema not found: ", model_name)
-
-                the_lazy_declaration += f'\n\t\tprivate readonly Lazy<I{model_name}Repository> _{model_name[0].lower() + model_name[1:]}Repository;'
-                the_lazy_ctor += f'\n\t\t\t_{model_name[0].lower() + model_name[1:]}Repository = new Lazy<I{model_name}Repository>(()=>new {model_name}Repository(repositoryContext));'
-                the_lazy_instantiation += f'\n\t\tpublic I{model_name}Repository {model_name} => _{model_name[0].lower() + model_name[1:]}Repository.Value;'
-        final_design = repository_manager_design.replace('THE_USING_STATEMENT', the_using_statement).replace(
-            'THE_LAZY_DECLARATION', the_lazy_declaration).replace('THE_LAZY_CTOR', the_lazy_ctor).replace(
-            'THE_LAZY_INSTANTIATION', the_lazy_instantiation)
-        repository_manager.write(final_design)
+def _repository_files():
+    template = get_template('repository')
+    return lambda model: model.name + 'Repository.cs', \
+        lambda model: template.render(_extended_values(model, 'repository', _model_values(model))), \
+        _extended_source(template, 'repository')
+
+
+def create_repository_manager(models, repository_manager_file_path: str, incremental: bool = False, output=None):
+    catalog = as_catalog(models)
+    field_accessors = get_option('manager_accessors') == 'field'
+    if get_option('split_aggregates'):
+        def render_schema(schema_models):
+            return _split_manager_members(schema_models, 'Repository', lambda model: model.name, '_repositoryContext',
+                                          not field_accessors)
+
+        _write_split_aggregate(catalog, repository_manager_file_path, 'repository_manager', render_schema,
+                               None if field_accessors else 'Initialize{}Schema', incremental, output)
+        print(f"Repository manager created")
+        return
+
+    template = get_template('repository_manager')
+
+    def render(catalog):
+        the_using_statement = ''.join(f'using CNET_V7_Repository.Contracts.{schema}Schema;\nusing CNET_V7_Repository.Implementation.{schema}Schema;\n'
+                                      for schema in catalog.schemas)
+        if field_accessors:
+            # a null backing field per entity, the repository is only created on first use
+            the_lazy_declaration = ''.join(f'\n\t\tprivate I{model.name}Repository _{model.camel_name}Repository;'
+                                           for model in catalog)
+            the_lazy_ctor = ''
+            the_lazy_instantiation = ''.join(f'\n\t\tpublic I{model.name}Repository {model.name} => _{model.camel_name}Repository ??= new {model.name}Repository(_repositoryContext);'
+                                             for model in catalog)
+        else:
+            the_lazy_declaration = ''.join(f'\n\t\tprivate readonly Lazy<I{model.name}Repository> _{model.camel_name}Repository;'
+                                           for model in catalog)
+            the_lazy_ctor = ''.join(f'\n\t\t\t_{model.camel_name}Repository = new Lazy<I{model.name}Repository>(()=>new {model.name}Repository(repositoryContext));'
+                                    for model in catalog)
+            the_lazy_instantiation = ''.join(f'\n\t\tpublic I{model.name}Repository {model.name} => _{model.camel_name}Repository.Value;'
+                                             for model in catalog)
+
+        return template.render(USING_STATEMENTS=the_using_statement, LAZY_DECLARATIONS=the_lazy_declaration,
+                               LAZY_CTOR=the_lazy_ctor, LAZY_INSTANTIATIONS=the_lazy_instantiation)
+
+    _write_aggregate(catalog, repository_manager_file_path, 'repository_manager', render, template.source,
+                     incremental, output)
     print(f"Repository manager created")
 
 
-def create_iservice_manager(model_path_dir: str, iservice_manager_file_path: str):
-    iservice_manager_init = '''
-THE_USING_STATEMENT
-using System;
-using System.Collections.Generic;
-using System.Linq;
-using System.Text;
-using System.Threading.Tasks;
-
-namespace CNET_V7_Service.Contracts
-{
-    public interface IServiceManager
-    {
-THE_DECLARATION
-    }
-}
+def create_iservice_manager(models, iservice_manager_file_path: str, incremental: bool = False, output=None):
+    catalog = as_catalog(models)
+    if get_option('split_aggregates'):
+        def render_schema(schema_models):
+            return ''.join(f'        I{model.name}Service {model.camel_name}Service ' + '{ get; }\n'
+                           for model in schema_models)
 
-    '''
-    the_using_statement = ''
-    the_declaration = ''
-    using_printed_schemas = []
-    with open(iservice_manager_file_path, 'w+') as iservice_manager:
-        for root, dirs, files in os.walk(model_path_dir):
-            for file in files:
-                model_name, file_extension = os.path.splitext(file)
-                if find_schema(model_name) not in using_printed_schemas:
-                    using_printed_schemas.append(find_schema(model_name))
-                    the_using_statement += f'using CNET_V7_Service.Contracts.{find_schema(model_name)}Schema;\n'
-                the_declaration += f'\t\tI{model_name}Service {model_name[0].lower() + model_name[1:]}Service ' + \
-                    '{ get; }\n'
-        iservice_manager.write(
-            iservice_manager_init.replace('THE_USING_STATEMENT', the_using_statement).replace('THE_DECLARATION',
-                                                                                              the_declaration))
-    print("IServiceManager.cs file created.")
+        _write_split_aggregate(catalog, iservice_manager_file_path, 'iservice_manager', render_schema, None,
+                               incremental, output)
+        print("IServiceManager.cs file created.")
+        return
 
+    template = get_template('iservice_manager')
 
-def create_iservice(model_path_dir: str, iservice_root_dir: str):
-    iservice_sample = '''
-using CNET_V7_Domain.DataModels.SCHEMASchema;
-using CNET_V7_Entities.DataModels;
-using System;
-using System.Collections.Generic;
-using System.Linq;
-using System.Text;
-using System.Threading.Tasks;
+    def render(catalog):
+        the_using_statement = ''.join(f'using CNET_V7_Service.Contracts.{schema}Schema;\n'
+                                      for schema in catalog.schemas)
+        the_declaration = ''.join(f'\t\tI{model.name}Service {model.camel_name}Service ' + '{ get; }\n'
+                                  for model in catalog)
+        return template.render(USING_STATEMENTS=the_using_statement, DECLARATIONS=the_declaration)
 
-namespace CNET_V7_Service.Contracts.SCHEMASchema
-{
-    public interface IMODEL_NAMEService : IService<MODEL_NAMEDTO>
-    {
+    _write_aggregate(catalog, iservice_manager_file_path, 'iservice_manager', render, template.source, incremental,
+                     output)
+    print("IServiceManager.cs file created.")
 
-    }
-}'''
-
-    for root, dirs, files in os.walk(model_path_dir):
-        filenames = [os.path.splitext(file)[0] for file in files]
-        name = 'mahtot'
-        # print(filenames)
-        for name in filenames:
-            schema = find_schema(name)
-
-            if not os.path.exists(os.path.join(iservice_root_dir, schema)):
-                os.mkdir(os.path.join(iservice_root_dir, schema))
-
-            file_name = 'I' + name + 'Service'
-            with open(os.path.join(iservice_root_dir, schema, file_name + '.cs'), 'w+') as file:
-                # let me replace it
-                file.write(iservice_sample.replace(
-                    'SCHEMA', schema).replace('MODEL_NAME', name))
-    print(" All IService Files Are Created")
 
+def create_iservice(models, iservice_root_dir: str, incremental: bool = False, workers: int = 0, output=None):
+    _write_per_model(as_catalog(models), iservice_root_dir, 'iservice', *_iservice_files(),
+                     incremental, workers, output)
+    print(" All IService Files Are Created")
 
-def create_service_manager(model_path_dir: str, service_manager_file_path: str):
-    repository_manager_design = '''
-using AutoMapper;
-using CNET_V7_Logger;
-using CNET_V7_Repository.Contracts;
-using CNET_V7_Service.Contracts;
-THE_USING_STATEMENT
-using System;
-using System.Collections.Generic;
-using System.Linq;
-using System.Text;
-using System.Threading.Tasks;
-
-namespace CNET_V7_Service.Implementation
-{
-    public class ServiceManager : IServiceManager
-    {
-
-        THE_LAZY_DECLARATION
-        public ServiceManager(IRepositoryManager repositoryManager, ILoggerManager logger, IMapper mapper)
-        {
-            THE_LAZY_CTOR
-        }
-        
-        THE_LAZY_INSTANTIATION
-    }
-}
 
-    '''
-    the_using_statement = ''
-    the_lazy_declaration = ''
-    the_lazy_ctor = ''
-    the_lazy_instantiation = ''
-
-    using_printed_schemas = []
-    with open(service_manager_file_path, 'w+') as repository_manager:
-        for root, dirs, files in os.walk(model_path_dir):
-            for file in files:
-                model_name, file_extension = os.path.splitext(file)
-                schema = find_schema(model_name)
-                if schema not in using_printed_schemas:
-                    using_printed_schemas.append(schema)
-                    the_using_statement += f'using CNET_V7_Service.Contracts.{schema}Schema;\nusing CNET_V7_Service.Implementation.{schema}Schema;\n'
-                if schema == -1:
-                    print("schema not found: ", model_name)
-
-                the_lazy_declaration += f'\n\t\tprivate readonly Lazy<I{model_name}Service> _{model_name[0].lower() + model_name[1:]}Service;'
-
-                the_lazy_ctor += f'\n\t\t\t_{model_name[0].lower() + model_name[1:]}Service = new Lazy<I{model_name}Service>(()=>new {model_name}Service(repositoryManager, logger, mapper));'
-
-                the_lazy_instantiation += f'\n\t\tpublic I{model_name}Service {model_name[0].lower() + model_name[1:]}Service => _{model_name[0].lower() + model_name[1:]}Service.Value;'
+def _iservice_files():
+    template = get_template('iservice')
+    return lambda model: 'I' + model.name + 'Service.cs', \
+        lambda model: template.render(_extended_values(model, 'iservice', _model_values(model))), \
+        _extended_source(template, 'iservice')
+
+
+def create_service_manager(models, service_manager_file_path: str, incremental: bool = False, output=None):
+    catalog = as_catalog(models)
+    field_accessors = get_option('manager_accessors') == 'field'
+    if get_option('split_aggregates'):
+        def render_schema(schema_models):
+            return _split_manager_members(schema_models, 'Service', lambda model: model.camel_name + 'Service',
+                                          '_repositoryManager, _logger, _mapper', not field_accessors)
+
+        _write_split_aggregate(catalog, service_manager_file_path, 'service_manager', render_schema,
+                               None if field_accessors else 'Initialize{}Schema', incremental, output)
+        print(f"Service manager created")
+        return
+
+    template = get_template('service_manager')
+
+    def render(catalog):
+        the_using_statement = ''.join(f'using CNET_V7_Service.Contracts.{schema}Schema;\nusing CNET_V7_Service.Implementation.{schema}Schema;\n'
+                                      for schema in catalog.schemas)
+        if field_accessors:
+            # the constructor only keeps its arguments, each service is created on first use into a null field
+            the_lazy_declaration = '\n\t\tprivate readonly IRepositoryManager _repositoryManager;' \
+                                   '\n\t\tprivate readonly ILoggerManager _logger;' \
+                                   '\n\t\tprivate readonly IMapper _mapper;\n' + \
+                                   ''.join(f'\n\t\tprivate I{model.name}Service _{model.camel_name}Service;'
+                                           for model in catalog)
+            the_lazy_ctor = '\n\t\t\t_repositoryManager = repositoryManager;' \
+                            '\n\t\t\t_logger = logger;' \
+                            '\n\t\t\t_mapper = mapper;'
+            the_lazy_instantiation = ''.join(f'\n\t\tpublic I{model.name}Service {model.camel_name}Service => _{model.camel_name}Service ??= new {model.name}Service(_repositoryManager, _logger, _mapper);'
+                                             for model in catalog)
+        else:
+            the_lazy_declaration = ''.join(f'\n\t\tprivate readonly Lazy<I{model.name}Service> _{model.camel_name}Service;'
+                                           for model in catalog)
+            the_lazy_ctor = ''.join(f'\n\t\t\t_{model.camel_name}Service = new Lazy<I{model.name}Service>(()=>new {model.name}Service(repositoryManager, logger, mapper));'
+                                    for model in catalog)
+            the_lazy_instantiation = ''.join(f'\n\t\tpublic I{model.name}Service {model.camel_name}Service => _{model.camel_name}Service.Value;'
+                                             for model in catalog)
         # so we can write it
-        final_design = repository_manager_design.replace('THE_USING_STATEMENT', the_using_statement).replace(
-            'THE_LAZY_DECLARATION', the_lazy_declaration).replace('THE_LAZY_CTOR', the_lazy_ctor).replace(
-            'THE_LAZY_INSTANTIATION', the_lazy_instantiation)
-        repository_manager.write(final_design)
+        return template.render(USING_STATEMENTS=the_using_statement, LAZY_DECLARATIONS=the_lazy_declaration,
+                               LAZY_CTOR=the_lazy_ctor, LAZY_INSTANTIATIONS=the_lazy_instantiation)
+
+    _write_aggregate(catalog, service_manager_file_path, 'service_manager', render, template.source, incremental,
+                     output)
     print(f"Service manager created")
 
 
-def create_iservice_implementation(model_path_dir: str, iservice_implementation_root: str):
-    implementation_sample = '''
-using AutoMapper;
-using CNET_V7_Domain.DataModels.SCHEMA_NAMESchema;
-using CNET_V7_Entities.DataModels;
-using CNET_V7_Logger;
-using CNET_V7_Repository.Contracts;
-using CNET_V7_Service.Contracts.SCHEMA_NAMESchema;
-using CNET_V7_Service.Contracts;
-using System;
-using System.Collections.Generic;
-using System.Linq;
-using System.Text;
-using System.Threading.Tasks;
-using System.Linq.Expressions;
-using CNET_V7_Domain.Misc;
-using Azure;
-
-namespace CNET_V7_Service.Implementation.SCHEMA_NAMESchema
-{
-    public class MODEL_NAMEService : IMODEL_NAMEService
-    {
-        private readonly IRepositoryManager _repository;
-        private readonly ILoggerManager _logger;
-        private readonly IMapper _mapper;
-
-        public MODEL_NAMEService(IRepositoryManager repository, ILoggerManager logger, IMapper mapper)
-        {
-            _repository = repository;
-            _logger = logger;
-            _mapper = mapper;
-        }
-
-        public async Task<ResponseModel<MODEL_NAMEDTO>> Create(MODEL_NAMEDTO entity)
-        {
-            try
-            {
-                //map dto to entity
-                var LOWER_START_SAFE = _mapper.Map<SAFE_MODEL_NAME>(entity);
-                
-                //fetch entity obj
-                var createdObj = await _repository.MODEL_NAME.Create(LOWER_START_SAFE);
-
-                //map fetched entity to dto
-                var returnedObj = _mapper.Map<MODEL_NAMEDTO>(createdObj);
-                
-                //return response object
-
-                return new ResponseModel<MODEL_NAMEDTO>() { Success = true, Data = returnedObj }; ;
-            }
-            catch (Exception e)
-            {
-                _logger.LogError(e.Message);
-                return new ResponseModel<MODEL_NAMEDTO> () { Success = false, Ex = e, Message = e.Message };
-            }
-        }
-
-        public async Task<ResponseModel<MODEL_NAMEDTO>> Delete(int id)
-        {
-            try
-            {
-                var res = await _repository.MODEL_NAME.Delete(id);
-                var returnedObj = _mapper.Map<MODEL_NAMEDTO>(res);
-                return new ResponseModel<MODEL_NAMEDTO>() { Success = true, Data = returnedObj }; 
-            }
-            catch (Exception e)
-            {
-                _logger.LogError(e.Message);
-                return new ResponseModel<MODEL_NAMEDTO>() { Success = false, Ex = e, Message = e.Message };
-            }
-        }
-
-        public async Task<ResponseModel<IEnumerable<MODEL_NAMEDTO>>> FindAll(bool trackChanges)
-        {
-            try
-            {
-                var result = await _repository.MODEL_NAME.FindAll(trackChanges);
-                var returnedObj = _mapper.Map<IEnumerable<MODEL_NAMEDTO>>(result);
-                return new ResponseModel<IEnumerable<MODEL_NAMEDTO>>() { Success = true, Data = returnedObj };
-            }
-            catch (Exception e)
-            {
-                _logger.LogError(e.Message);
-                return new ResponseModel<IEnumerable<MODEL_NAMEDTO>>() { Success = false, Ex = e, Message = e.Message };
-            }
-        }
-
-        public async Task<ResponseModel<MODEL_NAMEDTO>> FindById(int id)
-        {
-            try
-            {
-                var result = await _repository.MODEL_NAME.FindById(id);
-                var returnedObj = _mapper.Map<MODEL_NAMEDTO>(result);
-                return new ResponseModel<MODEL_NAMEDTO>() { Success = true, Data = returnedObj };
-            }
-            catch (Exception e)
-            {
-                _logger.LogError(e.Message);
-                return new ResponseModel<MODEL_NAMEDTO>() { Success = false, Ex = e, Message = e.Message };
-            }
-        }
-
-        public async Task<ResponseModel<MODEL_NAMEDTO>> Update(MODEL_NAMEDTO entity)
-        {
-            try
-            {
-                var LOWER_START_SAFE = _mapper.Map<SAFE_MODEL_NAME>(entity);
-                var updatedObject = await _repository.MODEL_NAME.Update(LOWER_START_SAFE);
-                var returnedObj = _mapper.Map<MODEL_NAMEDTO>(updatedObject);
-                return new ResponseModel<MODEL_NAMEDTO>() { Success = true, Data = returnedObj }; ;
-            }
-            catch (Exception e)
-            {
-                _logger.LogError(e.Message);
-                return new ResponseModel<MODEL_NAMEDTO>() { Success = false, Ex = e, Message = e.Message };
-            }
-        }
-    }
-}
-            '''
-
-    for root, dirs, files in os.walk(model_path_dir):
-        filenames = [os.path.splitext(file)[0] for file in files]
-        # print(filenames)
-        for name in filenames:
-            schema = find_schema(name)
-
-            if not os.path.exists(os.path.join(iservice_implementation_root, schema)):
-                os.mkdir(os.path.join(iservice_implementation_root, schema))
-
-            # repo_name = 'I' + name + 'Repository'
-            with open(os.path.join(iservice_implementation_root, schema, name + 'Service.cs'), 'w+') as file:
-                # let me replace it
-                file.write(implementation_sample.replace('SAFE_MODEL_NAME', safe_model_name(name)).replace('MODEL_NAME',
-                                                                                                           name).replace(
-                    'SCHEMA_NAME', schema).replace('LOWER_START_SAFE',
-                                                   safe_model_name(name)[0].lower() + safe_model_name(name)[1:]))
+def create_iservice_implementation(models, iservice_implementation_root: str, incremental: bool = False,
+                                   workers: int = 0, output=None):
+    _write_per_model(as_catalog(models), iservice_implementation_root, 'service', *_service_files(),
+                     incremental, workers, output)
     print(" All Service Implementation Files Are Created")
 
 
-def create_controllers(model_path_dir: str, controller_root: str):
-    implementation_sample = '''using CNET_V7_Domain.DataModels.SCHEMASchema;
-using CNET_V7_Entities.DataModels;
-using CNET_V7_Service.Contracts;
-using Microsoft.AspNetCore.Mvc;
-using System;
-using System.Collections.Generic;
-using System.Linq;
-using System.Text;
-using System.Threading.Tasks;
-
-namespace CNET_V7_Presentation.BaseControllers.SCHEMASchema
-{
-    [Route("api/[controller]")]
-    [ApiController]
-    public class MODEL_NAMEController : ControllerBase
-    {
-        private readonly IService<SAFE_MODEL_NAME, MODEL_NAMEDTO> _commonService;
-
-        public MODEL_NAMEController(IService<SAFE_MODEL_NAME, MODEL_NAMEDTO> commonService)
-        {
-            _commonService = commonService;
-        }
-
-        [HttpGet("{id}")]
-        public async Task<IActionResult> GetMODEL_NAMEById(int id)
-        {
-            var response = await _commonService.FindById(id);
-            if (response.Success) return Ok(response.Data);
-            return BadRequest(response.Ex.ToString());
-        }
-
-        [HttpGet]
-        public async Task<IActionResult> GetAllMODEL_NAMEs()
-        {
-            var response = await _commonService.FindAll(trackChanges: false);
-            if(response.Success)
-                return Ok(response.Data);
-            return BadRequest(response.Message);
-        }
-
-        [HttpPost]
-        public async Task<IActionResult> CreateMODEL_NAME([FromBody] MODEL_NAMEDTO PARAMETER)
-        {
-            if (PARAMETER is null)
-                return BadRequest("MODEL_NAME_CAMILE is null");
-            var response = await _commonService.Create(PARAMETER);
-            if (response.Success)
-                return Ok(response.Data);
-            return BadRequest(response.Ex.ToString());
-        }
-
-        [HttpPut]
-        public async Task<IActionResult> UpdateMODEL_NAME([FromBody] MODEL_NAMEDTO PARAMETER)
-        {
-            if (PARAMETER is null) return BadRequest("MODEL_NAME_CAMILE is null");
-            var response = await _commonService.Update(PARAMETER);
-            if(response.Success) return Ok(response.Data);
-            return BadRequest(response.Ex.ToString());
-        }
-
-        [HttpDelete("{id}")]
-        public async Task<IActionResult> DeleteMODEL_NAME(int id)
-        {
-            var response = await _commonService.Delete(id);
-            if (response.Success)
-                return NoContent();
-            return BadRequest(response.Ex.ToString());
-        }
+def _service_files():
+    template = get_template('service')
+    return lambda model: model.name + 'Service.cs', \
+        lambda model: template.render(_extended_values(model, 'service', _model_values(model))), \
+        _extended_source(template, 'service')
+
+
+def _mapping_values(model: ModelEntry) -> tuple:
+    """
+    The placeholder values of the mapping calls in the service template and the usings they need, by the mapping
+    option.
+    """
+    if get_option('mapping') == 'explicit':
+        return {
+            'TO_ENTITY': f'{model.name}Mappings.ToEntity',
+            'TO_DTO': f'{model.name}Mappings.ToDto',
+            'TO_DTOS': f'{model.name}Mappings.ToDtos',
+            'TO_ENTITIES': f'{model.name}Mappings.ToEntities',
+        }, [f'using CNET_V7_Service.Mappings.{model.schema}Schema;']
+    return {
+        'TO_ENTITY': f'_mapper.Map<{model.safe_name}>',
+        'TO_DTO': f'_mapper.Map<{model.name}DTO>',
+        'TO_DTOS': f'_mapper.Map<IEnumerable<{model.name}DTO>>',
+        'TO_ENTITIES': f'_mapper.Map<List<{model.safe_name}>>',
+    }, []
+
+
+def create_controllers(models, controller_root: str, incremental: bool = False, workers: int = 0, output=None):
+    _write_per_model(as_catalog(models), controller_root, 'controller', *_controller_files(), incremental, workers,
+                     output)
+    print(" All Controller Implementation Files Are Created")
+
+
+def _controller_files():
+    template = get_template('controller')
+
+    def render(model):
+        parameter = model.camel_name
+        if model.name.lower() == 'delegate':
+            parameter = 'delegateObj'
+        elif model.name.lower() == 'range':
+            parameter = 'rangeObj'
+        return template.render(_extended_values(model, 'controller', {**_model_values(model), 'PARAMETER': parameter}))
+
+    return lambda model: model.name + 'Controller.cs', render, _extended_source(template, 'controller')
+
+
+def configure_mapping(models, mapping_file_path: str, incremental: bool = False, output=None):
+    catalog = as_catalog(models)
+    if get_option('split_aggregates'):
+        def render_schema(schema_models):
+            return ''.join(f'            CreateMap<{model.safe_name}, {model.name}DTO>().ReverseMap();\n'
+                           for model in schema_models)
+
+        _write_split_aggregate(catalog, mapping_file_path, 'mapping', render_schema, 'Configure{}Schema', incremental,
+                               output)
+        print("Mapping.cs file created.")
+        return
+
+    template = get_template('mapping')
+
+    def render(catalog):
+        the_using_statement = ''.join(f'using CNET_V7_Domain.DataModels.{schema}Schema;\n'
+                                      for schema in catalog.schemas)
+        the_configuration = ''.join(f'\t\t\tCreateMap<{model.safe_name}, {model.name}DTO>().ReverseMap();\n'
+                                    for model in catalog)
+        return template.render(USING_STATEMENTS=the_using_statement, CONFIGURATION=the_configuration)
+
+    _write_aggregate(catalog, mapping_file_path, 'mapping', render, template.source, incremental, output)
+    print("Mapping.cs file created.")
+
+
+def create_mapping_methods(models, mapping_methods_root: str, incremental: bool = False, workers: int = 0,
+                           output=None):
+    _write_per_model(as_catalog(models), mapping_methods_root, 'mapping_methods', *_mapping_methods_files(),
+                     incremental, workers, output)
+    print(" All Mapping Method Files Are Created")
+
+
+def _mapping_methods_files():
+    template = get_template('mapping_methods')
+
+    def render(model):
+        properties = _mapped_properties(model)
+        return template.render(
+            _model_values(model),
+            DTO_ASSIGNMENTS=''.join(f'            {name} = entity.{name},\n' for name in properties),
+            ENTITY_ASSIGNMENTS=''.join(f'            {name} = dto.{name},\n' for name in properties))
+
+    return lambda model: model.name + 'Mappings.cs', render, template.source
+
+
+def create_json_contexts(models, json_context_root: str, incremental: bool = False, output=None):
+    template = get_template('json_context')
+
+    def render(schema, schema_models):
+        # the DTO itself and the collections the services return it in
+        serializable_types = ''.join(f'[JsonSerializable(typeof({dto}))]\n'
+                                     f'[JsonSerializable(typeof(List<{dto}>))]\n'
+                                     f'[JsonSerializable(typeof(IEnumerable<{dto}>))]\n'
+                                     for dto in [model.name + 'DTO' for model in schema_models])
+        return template.render(SCHEMA_NAME=schema, SERIALIZABLE_TYPES=serializable_types)
+
+    _write_per_schema(as_catalog(models), json_context_root, 'json_context', lambda schema: schema + 'JsonContext.cs',
+                      render, template.source, incremental, output)
+    print(" All Json Context Files Are Created")
+
+
+def _mapped_properties(model: ModelEntry) -> list:
+    """
+    The names of the properties copied between the entity and its DTO, which has the same scalar properties as the
+    entity (see create_dto).
+    """
+    return [entity_property.name for entity_property in model.entity.scalar_properties if entity_property.settable]
+
+
+def _model_values(model: ModelEntry) -> dict:
+    """
+    The placeholder values every per-model template can use.
+    """
+    return {
+        'MODEL_NAME': model.name,
+        'SAFE_MODEL_NAME': model.safe_name,
+        'SCHEMA_NAME': model.schema,
+        'CAMEL_MODEL_NAME': model.camel_name,
+        'CAMEL_SAFE_MODEL_NAME': model.safe_name[0].lower() + model.safe_name[1:],
     }
-}'''
-
-    for root, dirs, files in os.walk(model_path_dir):
-        filenames = [os.path.splitext(file)[0] for file in files]
-        # print(filenames)
-        for model_name in filenames:
-            schema = find_schema(model_name)
-
-            if not os.path.exists(os.path.join(controller_root, schema)):
-                os.mkdir(os.path.join(controller_root, schema))
-
-            # repo_name = 'I' + name + 'Repository'
-            with open(os.path.join(controller_root, schema, model_name + 'Controller.cs'), 'w+') as file:
-                # let me replace it
-                parameter = model_name[0].lower() + model_name[1:]
-                if model_name.lower() == 'delegate':
-                    parameter = 'delegateObj'
-                elif model_name.lower() == 'range':
-                    parameter = 'rangeObj'
-                file.write(
-                    implementation_sample.replace(
-                        'MODEL_NAME_CAMILE', model_name[0].lower() + model_name[1:])
-                    .replace('SAFE_MODEL_NAME', safe_model_name(model_name))
-                    .replace('MODEL_NAME', (model_name))
-                    .replace('SCHEMA', schema)
-                    .replace('PARAMETER', parameter))
 
-    print(" All Controller Implementation Files Are Created")
 
+# per-model generator -> the options adding members to its files, each through its <generator>_<option> snippet
+# template (see cs_templates)
+EXTENSIONS = {
+    'irepository': ['paging', 'projection', 'bulk'],
+    'repository': ['paging', 'projection', 'bulk', 'compiled_queries'],
+    'iservice': ['paging', 'projection', 'bulk'],
+    'service': ['paging', 'projection', 'bulk'],
+    'controller': ['paging', 'bulk', 'caching'],
+}
+
+# (generator, option) -> the usings the snippet needs beyond those of the template it is added to
+_EXTENSION_USINGS = {
+    ('irepository', 'projection'): ['using System.Linq.Expressions;'],
+    ('repository', 'projection'): ['using System.Linq.Expressions;'],
+    ('iservice', 'paging'): ['using System.Threading;', 'using CNET_V7_Domain.Misc;'],
+    ('iservice', 'projection'): ['using CNET_V7_Domain.Misc;'],
+    ('iservice', 'bulk'): ['using CNET_V7_Domain.Misc;'],
+    ('service', 'paging'): ['using System.Threading;', 'using System.Runtime.CompilerServices;'],
+    ('controller', 'paging'): ['using System.Threading;'],
+    ('controller', 'caching'): ['using System.Collections.Concurrent;', 'using System.Security.Cryptography;',
+                                'using System.Text.Json;', 'using Microsoft.AspNetCore.Http;',
+                                'using Microsoft.AspNetCore.OutputCaching;',
+                                'using Microsoft.Extensions.DependencyInjection;', 'using Microsoft.Extensions.Options;',
+                                'using Microsoft.Net.Http.Headers;'],
+}
 
-def configure_mapping(model_path_dir: str, mapping_file_path: str):
-    mapping_init = '''
-using AutoMapper;
-THE_USING_STATEMENT
-using CNET_V7_Entities.DataModels;
-
-namespace CNET_V7_API.MappingProfile
-{
-    public class MappingProfile : Profile
-    {
-        public MappingProfile() {
-            CreateMap<Account, AccountDTO>().ReverseMap();
-THE_CONFIGURATION
-        } 
+# the options whose queries look rows up by the Id, so they skip the entities without one
+_KEYED_OPTIONS = ('paging', 'bulk', 'compiled_queries')
+
+# the options applying to every entity whose lookups by the Id are in a separate <generator>_<option>_keyed snippet,
+# added only for the entities with one
+_PARTLY_KEYED_OPTIONS = ('projection',)
+
+# the types of an Id keyset paging can seek by. The controllers and the base repository and service take an int id,
+# which converts implicitly to these but not to short, so entities with a short Id don't get the keyed options
+_KEY_TYPES = ('int', 'long')
+
+
+def _key_property(model: ModelEntry):
+    """
+    The integral Id property the paged and projected queries order, seek and look up by, None if the entity has
+    none.
+    """
+    for entity_property in model.entity.scalar_properties:
+        if entity_property.name == 'Id' and entity_property.type in _KEY_TYPES:
+            return entity_property
+    return None
+
+
+def _applies(model: ModelEntry, option: str) -> bool:
+    # whether the option is enabled and applies to the model
+    if option == 'caching':
+        schemas = [schema.lower() for schema in get_option('caching')]
+        return '*' in schemas or model.schema.lower() in schemas
+    return bool(get_option(option)) and (option not in _KEYED_OPTIONS or _key_property(model) is not None)
+
+
+def _extensions(model: ModelEntry, generator: str) -> list:
+    """
+    The enabled options adding members to the file of the model, see EXTENSIONS.
+    """
+    return [option for option in EXTENSIONS.get(generator, []) if _applies(model, option)]
+
+
+def _extended_source(template, generator: str) -> str:
+    # the snippets of the enabled options count as part of the template, so editing one renders the files again
+    return template.source + ''.join(get_template(name).source
+                                     for option in EXTENSIONS.get(generator, []) if get_option(option)
+                                     for name in _snippet_names(generator, option))
+
+
+def _snippet_names(generator: str, option: str, keyed: bool = True) -> list:
+    # the snippet templates of the option, the _keyed one of a partly keyed option only if keyed (the model has an Id)
+    names = [f'{generator}_{option}']
+    if keyed and option in _PARTLY_KEYED_OPTIONS:
+        names.append(f'{generator}_{option}_keyed')
+    return names
+
+
+def _caching_values(model: ModelEntry, key, parameter: str) -> dict:
+    """
+    The placeholders the caching option fills in the controller actions: the output cache attributes and tags of the
+    reads, their 304 answers to a known ETag, the ETag of their responses and the cache entries each write evicts.
+    Without caching they are plain.
+    """
+    if not _applies(model, 'caching'):
+        return {**dict.fromkeys(['READ_ATTRIBUTES', 'READ_BY_ID_ATTRIBUTES', 'READ_PROLOGUE', 'READ_BY_ID_PROLOGUE',
+                                 'ON_CREATE', 'ON_UPDATE', 'ON_DELETE', 'ON_UPDATE_MANY', 'ON_DELETE_MANY'], ''),
+                'READ_OK': 'Ok'}
+
+    def attribute(tag):
+        return f'\n        [OutputCache(Duration = {get_option("cache_seconds")}, Tags = new[] {{ "{tag}" }})]'
+
+    def invalidate(ids):
+        return f'            if (response.Success)\n                await InvalidateCacheAsync({ids});\n'
+
+    tag = f'{model.schema}.{model.name}'
+    not_modified = '            if (NotModified())\n                return StatusCode(304);\n'
+    # without an integral Id the written row isn't known, so an update evicts every row
+    return {
+        'READ_ATTRIBUTES': attribute(tag),
+        'READ_BY_ID_ATTRIBUTES': attribute(tag + '.Rows'),
+        'READ_PROLOGUE': not_modified,
+        'READ_BY_ID_PROLOGUE': '            TagRow(id);\n' + not_modified,
+        'CACHE_SECONDS': str(get_option('cache_seconds')),
+        'READ_OK': 'CachedOk',
+        'ON_CREATE': invalidate('Array.Empty<object>()'),
+        'ON_UPDATE': invalidate(f'new object[] {{ {parameter}.{key.name} }}' if key is not None else 'null'),
+        'ON_DELETE': invalidate('new object[] { id }'),
+        'ON_UPDATE_MANY': invalidate(f'dtos.Select(dto => (object)dto.{key.name})' if key is not None else 'null'),
+        'ON_DELETE_MANY': invalidate('ids.Cast<object>()'),
     }
+
+
+def _extended_values(model: ModelEntry, generator: str, values: dict) -> dict:
+    """
+    Adds the values of the EXTRA_* (and CTOR_BODY) placeholders to the values of a per-model template: the members
+    the enabled options add (see EXTENSIONS) and the usings, fields and constructor parameters these need. With the
+    default options they are all empty.
+    """
+    values = dict(values)
+    usings = []
+    fields = []
+    parameters = []
+    ctor_body = []
+    if generator == 'service':
+        mapping, mapping_usings = _mapping_values(model)
+        values.update(mapping)
+        usings += mapping_usings
+    key = _key_property(model)
+    if key is not None:
+        values.update(KEY_NAME=key.name, KEY_TYPE=key.type, PAGE_SIZE=str(get_option('page_size')),
+                      MAX_PAGE_SIZE=str(get_option('max_page_size')),
+                      MAX_BATCH_SIZE=str(get_option('max_batch_size')))
+    if generator == 'service':
+        values['PROJECTION'] = ''.join(f'            {name} = e.{name},\n' for name in _mapped_properties(model))
+    uses_service_manager = False
+    if generator == 'controller':
+        if _applies(model, 'projection'):
+            # the reads go to the projecting methods of the model's own service instead of the common one
+            uses_service_manager = True
+            values['FIND_BY_ID_CALL'] = (f'_serviceManager.{model.camel_name}Service.FindDtoById(id)' if key is not None
+                                         else '_commonService.FindById(id)')
+            values['FIND_ALL_CALL'] = f'_serviceManager.{model.camel_name}Service.FindAllDtos()'
+        else:
+            values['FIND_BY_ID_CALL'] = '_commonService.FindById(id)'
+            values['FIND_ALL_CALL'] = '_commonService.FindAll(trackChanges: false)'
+        values.update(_caching_values(model, key, values['PARAMETER']))
+
+    options = _extensions(model, generator)
+    members = [get_template(name).render(values)
+               for option in options for name in _snippet_names(generator, option, key is not None)]
+    for option in options:
+        usings += [using for using in _EXTENSION_USINGS.get((generator, option), []) if using not in usings]
+    if members and generator == 'repository':
+        # the base repository doesn't expose its context
+        fields.append('private readonly CnetV7DbContext _context;')
+        ctor_body.append('_context = context;')
+    if generator == 'controller' and (uses_service_manager or any(option != 'caching' for option in options)):
+        # the actions beyond IService reach the model's own service through the manager
+        fields.append('private readonly IServiceManager _serviceManager;')
+        parameters.append('IServiceManager serviceManager')
+        ctor_body.append('_serviceManager = serviceManager;')
+    if 'caching' in options:
+        fields.append('private readonly IOutputCacheStore _outputCacheStore;')
+        parameters.append('IOutputCacheStore outputCacheStore')
+        ctor_body.append('_outputCacheStore = outputCacheStore;')
+    return {
+        **values,
+        'EXTRA_USINGS': ''.join('\n' + using for using in usings),
+        'EXTRA_FIELDS': ''.join('\n        ' + field for field in fields),
+        'EXTRA_CTOR_PARAMETERS': ''.join(', ' + parameter for parameter in parameters),
+        'CTOR_BODY': ''.join(f'            {line}\n' for line in ctor_body),
+        'EXTRA_MEMBERS': ''.join(members),
+    }
+
+
+def _write_per_model(catalog: ModelCatalog, root_dir: str, generator: str, file_name, render, template: str,
+                     incremental: bool = False, workers: int = 0, output=None):
+    """
+    Writes one file per model into the schema folder of root_dir, named by file_name(model) and filled by render(model).
+
+    With incremental, a model's file is only rendered again when the model file, its schema, the template or the
+    generator version changed since the hashes recorded in the manifest of root_dir.
+
+    With more than one worker, the models are rendered and written on a thread pool so slow writes (e.g. to a network
+    share) overlap. The files are the same as in a serial run, only the order they are written in differs.
+
+    The files go through output (a FileSystemOutput by default), which only replaces the files whose content changed
+    and does so once every file of the generator rendered, so a failing model leaves the previous outputs in place.
+    """
+    stats = get_stats()
+    output = output or FileSystemOutput()
+    manifest = Manifest(root_dir) if incremental and output.supports_manifest else None
+    output_paths = []
+    pending = []
+    for model in catalog:
+        output_path = os.path.join(root_dir, model.schema, file_name(model))
+        output_paths.append(output_path)
+        key = content_hash(GENERATOR_VERSION, template, options_key(), model.schema, model.source_hash)
+        if manifest is not None and manifest.is_current(generator, output_path, key):
+            stats.count('files_skipped')
+            continue
+        pending.append((model, output_path, key))
+
+    # create every schema folder once up front, so the workers never race on it
+    for schema in dict.fromkeys(model.schema for model, _, _ in pending):
+        output.ensure_dir(os.path.join(root_dir, schema))
+
+    def write(model, output_path):
+        start = time.perf_counter()
+        content = render(model)
+        rendered = time.perf_counter()
+        changed = output.write(output_path, content)
+        written = time.perf_counter()
+        stats.add_time('render', rendered - start, generator)
+        stats.add_time('write', written - rendered, generator)
+        stats.record_model(generator, model.name, written - start)
+        _count_write(stats, content, changed)
+
+    try:
+        if workers and workers > 1 and not output.sequential:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # list() so the first failing model raises here
+                list(executor.map(lambda item: write(item[0], item[1]), pending))
+        else:
+            for model, output_path, _ in pending:
+                write(model, output_path)
+    except BaseException:
+        output.discard()
+        raise
+    with stats.timer('commit', generator):
+        output.commit()
+
+    if manifest is not None:
+        for _, output_path, key in pending:
+            manifest.record(generator, output_path, key)
+        if not catalog.partial:
+            manifest.prune(generator, output_paths)
+        manifest.save()
+
+
+def _write_aggregate(catalog: ModelCatalog, file_path: str, generator: str, render, template: str,
+                     incremental: bool = False, output=None):
+    """
+    Writes the single file that lists every model (a manager or the mapping profile), filled by render(catalog).
+
+    Aggregates only depend on the names and schemas of the models, so with incremental the file is kept as long as
+    no model was added, removed or moved to another schema.
+    """
+    stats = get_stats()
+    output = output or FileSystemOutput()
+    manifest = Manifest(os.path.dirname(file_path) or '.') if incremental and output.supports_manifest else None
+    # the schema files of an earlier split_aggregates run would declare every member a second time
+    stale = [] if catalog.partial else _stale_schema_files(file_path, generator, [], manifest)
+    key = content_hash(GENERATOR_VERSION, template, options_key(), *[(model.name, model.schema) for model in catalog])
+    if manifest is not None and manifest.is_current(generator, file_path, key) and not stale:
+        stats.count('files_skipped')
+        return
+
+    with stats.timer('render', generator):
+        content = render(catalog)
+    with stats.timer('write', generator):
+        changed = output.write(file_path, content)
+    for path in stale:
+        output.remove(path)
+    with stats.timer('commit', generator):
+        output.commit()
+    _count_write(stats, content, changed)
+    if manifest is not None:
+        manifest.record(generator, file_path, key)
+        manifest.prune(generator, [file_path])
+        manifest.save()
+
+
+def _stale_schema_files(file_path: str, generator: str, current: list, manifest: Manifest = None) -> list:
+    """
+    The schema files of a split aggregate next to file_path (<name>.<schema>.cs) that are not among current: the ones
+    the manifest recorded for the generator, and those whose text is the <generator>_schema template around its
+    members, so partial classes written by hand next to the aggregate are never taken for generated ones.
+    """
+    base_path, extension = os.path.splitext(file_path)
+    folder, name = os.path.split(base_path)
+    current_paths = {os.path.normpath(path) for path in current} | {os.path.normpath(file_path)}
+    stale = set()
+    if manifest is not None:
+        stale.update(path for path in manifest.output_paths(generator) if os.path.exists(path))
+    head, _, tail = get_template(generator + '_schema').source.partition('{{MEMBERS}}')
+    try:
+        file_names = os.listdir(folder or '.')
+    except FileNotFoundError:
+        file_names = []
+    for file_name in file_names:
+        schema = file_name[len(name) + 1:len(file_name) - len(extension)]
+        if not file_name.startswith(name + '.') or not file_name.endswith(extension) or not schema.isidentifier():
+            continue
+        path = os.path.normpath(os.path.join(folder, file_name))
+        if path in current_paths or path in stale:
+            continue
+        with open(path, encoding=ENCODING, errors='replace') as schema_file:
+            text = schema_file.read()
+        if text.startswith(head.replace('{{SCHEMA_NAME}}', schema)) and \
+                text.endswith(tail.replace('{{SCHEMA_NAME}}', schema)):
+            stale.add(path)
+    return sorted(stale - current_paths)
+
+
+def _split_manager_members(models: list, kind: str, accessor, arguments: str, lazy: bool) -> str:
+    """
+    The members a schema file of a split repository or service manager (kind 'Repository' or 'Service') has for its
+    models: a field per model, filled on first use by the accessor named accessor(model) with
+    new <Model><kind>(arguments). With lazy the fields hold a Lazy<T> instead, set up by the
+    Initialize<Schema>Schema method the constructor calls.
+    """
+    fields = []
+    initializers = []
+    accessors = []
+    for model in models:
+        interface = f'I{model.name}{kind}'
+        field = f'_{model.camel_name}{kind}'
+        creation = f'new {model.name}{kind}({arguments})'
+        if lazy:
+            # not readonly, as the initializer sets them instead of the constructor
+            fields.append(f'        private Lazy<{interface}> {field};\n')
+            initializers.append(f'            {field} = new Lazy<{interface}>(() => {creation});\n')
+            accessors.append(f'        public {interface} {accessor(model)} => {field}.Value;\n')
+        else:
+            fields.append(f'        private {interface} {field};\n')
+            accessors.append(f'        public {interface} {accessor(model)} => {field} ??= {creation};\n')
+    members = ''.join(fields) + '\n'
+    if lazy:
+        members += f'        private void Initialize{models[0].schema}Schema()\n        {{\n' \
+                   f'{"".join(initializers)}        }}\n\n'
+    return members + ''.join(accessors)
+
+
+def _write_split_aggregate(catalog: ModelCatalog, file_path: str, generator: str, render_schema, initializer: str,
+                           incremental: bool = False, output=None):
+    """
+    Writes an aggregate as partial class (or interface) files instead of one file listing every model: file_path
+    gets the part that doesn't list models (the <generator>_partial template), and <name>.<schema>.cs next to it the
+    members of the models of one schema (the <generator>_schema template, MEMBERS filled by render_schema(models)).
+
+    Each file is written as soon as it is rendered, so only one of them is held in memory, and with incremental a
+    schema's file is only rendered again when a model was added to, removed from or moved out of the schema.
+
+    The schema files of schemas without models anymore are deleted through output, see _stale_schema_files.
+
+    initializer formats the name of the method every schema file has for the constructor in file_path to call (e.g.
+    'Initialize{}Schema'), None if the schema files need no initialization.
+    """
+    stats = get_stats()
+    output = output or FileSystemOutput()
+    manifest = Manifest(os.path.dirname(file_path) or '.') if incremental and output.supports_manifest else None
+    partial_template = get_template(generator + '_partial')
+    schema_template = get_template(generator + '_schema')
+    by_schema = {}
+    for model in catalog:
+        by_schema.setdefault(model.schema, []).append(model)
+    # the constructor only changes when a schema is added or removed
+    initializers = ''.join(f'            {initializer.format(schema)}();\n' for schema in by_schema) \
+        if initializer else ''
+    base_path, extension = os.path.splitext(file_path)
+
+    files = [(file_path, content_hash(GENERATOR_VERSION, partial_template.source, options_key(), initializers),
+              lambda: partial_template.render(SCHEMA_INITIALIZERS=initializers))]
+    for schema, schema_models in by_schema.items():
+        key = content_hash(GENERATOR_VERSION, schema_template.source, options_key(), schema,
+                           *[(model.name, model.safe_name) for model in schema_models])
+        files.append((f'{base_path}.{schema}{extension}', key,
+                      lambda schema=schema, schema_models=schema_models:
+                      schema_template.render(SCHEMA_NAME=schema, MEMBERS=render_schema(schema_models))))
+
+    current = [path for path, _, _ in files]
+    # a schema that lost its models would declare their members a second time when it moved, so its file goes
+    stale = [] if catalog.partial else _stale_schema_files(file_path, generator, current, manifest)
+    written = []
+    try:
+        for path, key, render in files:
+            if manifest is not None and manifest.is_current(generator, path, key):
+                stats.count('files_skipped')
+                continue
+            with stats.timer('render', generator):
+                content = render()
+            with stats.timer('write', generator):
+                changed = output.write(path, content)
+            _count_write(stats, content, changed)
+            written.append((path, key))
+        for path in stale:
+            output.remove(path)
+    except BaseException:
+        output.discard()
+        raise
+    with stats.timer('commit', generator):
+        output.commit()
+
+    if manifest is not None:
+        for path, key in written:
+            manifest.record(generator, path, key)
+        manifest.prune(generator, current)
+        manifest.save()
+
+
+def _write_per_schema(catalog: ModelCatalog, root_dir: str, generator: str, file_name, render, template: str,
+                      incremental: bool = False, output=None):
+    """
+    Writes one file per schema into the schema folder of root_dir, named by file_name(schema) and filled by
+    render(schema, models of the schema).
+
+    With incremental, a schema's file is only rendered again when a model was added to or removed from the schema.
+    """
+    stats = get_stats()
+    output = output or FileSystemOutput()
+    manifest = Manifest(root_dir) if incremental and output.supports_manifest else None
+    by_schema = {}
+    for model in catalog:
+        by_schema.setdefault(model.schema, []).append(model)
+
+    output_paths = []
+    written = []
+    try:
+        for schema, schema_models in by_schema.items():
+            output_path = os.path.join(root_dir, schema, file_name(schema))
+            output_paths.append(output_path)
+            key = content_hash(GENERATOR_VERSION, template, options_key(), schema,
+                               *[model.name for model in schema_models])
+            if manifest is not None and manifest.is_current(generator, output_path, key):
+                stats.count('files_skipped')
+                continue
+            output.ensure_dir(os.path.join(root_dir, schema))
+            with stats.timer('render', generator):
+                content = render(schema, schema_models)
+            with stats.timer('write', generator):
+                changed = output.write(output_path, content)
+            _count_write(stats, content, changed)
+            written.append((output_path, key))
+    except BaseException:
+        output.discard()
+        raise
+    with stats.timer('commit', generator):
+        output.commit()
+
+    if manifest is not None:
+        for output_path, key in written:
+            manifest.record(generator, output_path, key)
+        manifest.prune(generator, output_paths)
+        manifest.save()
+
+
+def _count_write(stats, content: str, changed: bool):
+    if changed:
+        stats.count('files_written')
+        stats.count('bytes_written', len(content.encode('utf-8')))
+    else:
+        stats.count('files_unchanged')
+
+
+# generator key -> generator, in the order generate_all runs them
+GENERATORS = {
+    'dto': create_dto,
+    'irepository': create_irepositories,
+    'repository': create_irepository_implementation,
+    'irepository_manager': create_irepository_manager,
+    'repository_manager': create_repository_manager,
+    'iservice': create_iservice,
+    'service': create_iservice_implementation,
+    'iservice_manager': create_iservice_manager,
+    'service_manager': create_service_manager,
+    'controller': create_controllers,
+    'mapping': configure_mapping,
+    'mapping_methods': create_mapping_methods,
+    'json_context': create_json_contexts,
 }
 
-        '''
-    the_using_statement = ''
-    the_configuration = ''
-    using_printed_schemas = []
-    with open(mapping_file_path, 'w+') as mapping_file:
-        for _, _, files in os.walk(model_path_dir):
-            for file in files:
-                model_name, _ = os.path.splitext(file)
-                if find_schema(model_name) not in using_printed_schemas:
-                    using_printed_schemas.append(find_schema(model_name))
-                    the_using_statement += f'using CNET_V7_Domain.DataModels.{find_schema(model_name)}Schema;\n'
-                safe_model_name = model_name
-                if model_name.lower() in ['delegate', 'range', 'route']:
-                    safe_model_name = f'CNET_V7_Entities.DataModels.{model_name}'
-                the_configuration += f'\t\t\tCreateMap<{safe_model_name}, {model_name}DTO>().ReverseMap();\n'
-
-        mapping_file.write(
-            mapping_init.replace('THE_USING_STATEMENT', the_using_statement).replace('THE_CONFIGURATION',
-                                                                                     the_configuration))
-    print("Mapping.cs file created.")
+# the generators writing one file per model, the others write a single aggregate file
+PER_MODEL_GENERATORS = ['dto', 'irepository', 'repository', 'iservice', 'service', 'controller', 'mapping_methods']
+
+# the generators writing one file per schema, like the per-model ones into the schema folders of their target
+PER_SCHEMA_GENERATORS = ['json_context']
+
+# per-model generator key -> function returning the file_name(model) and render(model) functions and the template
+# source of its files, for callers that write the files themselves (see pipeline.py)
+PER_MODEL_FILES = {
+    'dto': _dto_files,
+    'irepository': _irepository_files,
+    'repository': _repository_files,
+    'iservice': _iservice_files,
+    'service': _service_files,
+    'controller': _controller_files,
+    'mapping_methods': _mapping_methods_files,
+}
 
 
-def safe_model_name(model_name: str):
-    if model_name.lower() in ['delegate', 'range', 'route']:
-        return f'CNET_V7_Entities.DataModels.{model_name}'
-    return model_name
+def output_root(key: str, target: str) -> str:
+    """
+    The folder a generator writes into and keeps its manifest in: its target, or the folder of the target for the
+    generators writing a single file.
+    """
+    if key in PER_MODEL_GENERATORS or key in PER_SCHEMA_GENERATORS:
+        return target
+    return os.path.dirname(target) or '.'
+
+
+def generate_all(model_path_dir: str, targets: dict, only: list = None, incremental: bool = False,
+                 workers: int = 0, stats_path: str = None, output=None, models: list = None,
+                 schemas: list = None) -> ModelCatalog:
+    """
+    Builds the model catalog once and runs the selected generators over it.
+
+    Args:
+    model_path_dir (str): The directory of the scaffolded entity files.
+    targets (dict): Generator key (see GENERATORS) -> the output root (or file, for managers and mapping) of it.
+    only (list): The generator keys to run. Defaults to every generator that has a target.
+    incremental (bool): Only render again the files whose inputs changed since the last incremental run.
+    workers (int): Render and write the per-model files on this many threads. 0 or 1 runs serially.
+    stats_path (str): Save the run statistics (timings, db round trips, files and bytes written) here as json.
+    output (FileSystemOutput): Where the files are written to, e.g. a MemoryOutput for a dry run. Defaults to the
+        file system, through one output shared by the generators so every folder is created once. Incremental runs
+        only apply to the file system.
+    models (list): Only render the per-model files of the entities with these names.
+    schemas (list): Only render the per-model files of the entities in these schemas. The aggregates always list
+        every model, so when they are selected together with a filter the whole model directory is still read.
+
+    Returns:
+    ModelCatalog: The catalog the per-model generators ran over, partial if it was filtered.
+    """
+    selected = only if only is not None else list(targets)
+    unknown = [key for key in selected if key not in GENERATORS]
+    if unknown:
+        raise ValueError(f"unknown generators: {', '.join(unknown)}")
+
+    stats = get_stats()
+    output = output or FileSystemOutput()
+    catalog = build_catalog(model_path_dir, models, schemas)
+    full_catalog = None if catalog.partial else catalog
+    for key, generator in GENERATORS.items():
+        if key in selected:
+            options = {'incremental': incremental, 'output': output}
+            if key in PER_MODEL_GENERATORS:
+                options['workers'] = workers
+                generator_catalog = catalog
+            else:
+                if full_catalog is None:
+                    full_catalog = build_catalog(model_path_dir)
+                generator_catalog = full_catalog
+            with stats.timer('total', key):
+                generator(generator_catalog, targets[key], **options)
+    if stats_path:
+        stats.save(stats_path)
+    return catalog
@@ -0,0 +1,208 @@
+"""
+Times every generator over synthetic entity folders of increasing size.
+
+The entities are scaffolded-looking classes spread over several schemas, and the schemas are served by an in-memory
+SqliteSchemaProvider, so no database is needed. Each run reports the time, files and bytes written, files per second
+and peak (python) memory of every generator, of a full generate_all and of the asyncio pipeline, and saves them as
+json so runs of different versions can be compared.
+
+    python benchmark.py --sizes 100 1000 10000 --results benchmark_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import database
+import entity_parser
+from Automate import GENERATORS, PER_MODEL_GENERATORS, PER_SCHEMA_GENERATORS, generate_all
+from catalog import build_catalog
+from manifest import GENERATOR_VERSION
+from pipeline import run_pipeline
+
+DEFAULT_SIZES = [100, 1000, 10000]
+
+DEFAULT_SCHEMAS = ['Common', 'Accounting', 'Transaction', 'Inventory', 'Security', 'Hr']
+
+_ENTITY_SAMPLE = '''using System;
+using System.Collections.Generic;
+
+namespace CNET_V7_Entities.DataModels;
+
+public partial class {name}
+{{
+    public int Id {{ get; set; }}
+
+    public string Code {{ get; set; }} = null!;
+
+    public string? Description {{ get; set; }}
+
+    public decimal Amount {{ get; set; }}
+
+    public DateTime CreatedOn {{ get; set; }}
+
+    public bool IsActive {{ get; set; }}
+
+    public int? {parent}Id {{ get; set; }}
+
+    public virtual {parent}? {parent} {{ get; set; }}
+
+    public virtual ICollection<{child}> {child}s {{ get; set; }} = new List<{child}>();
+}}
+'''
+
+
+def make_corpus(model_dir: str, size: int, schemas: list = None) -> dict:
+    """
+    Writes size synthetic entity files to model_dir and returns their table -> schema map.
+    """
+    schemas = schemas or DEFAULT_SCHEMAS
+    os.makedirs(model_dir, exist_ok=True)
+    names = [f'Entity{i:05d}' for i in range(size)]
+    schema_map = {}
+    for i, name in enumerate(names):
+        with open(os.path.join(model_dir, name + '.cs'), 'w+') as entity_file:
+            entity_file.write(_ENTITY_SAMPLE.format(name=name, parent=names[i // 2], child=names[(i * 7 + 1) % size]))
+        schema_map[name] = schemas[i % len(schemas)]
+    return schema_map
+
+
+def _targets(output_dir: str) -> dict:
+    targets = {}
+    for key in GENERATORS:
+        if key in PER_MODEL_GENERATORS or key in PER_SCHEMA_GENERATORS:
+            targets[key] = os.path.join(output_dir, key)
+            os.makedirs(targets[key], exist_ok=True)
+        else:
+            targets[key] = os.path.join(output_dir, key + '.cs')
+    return targets
+
+
+def _output_size(paths) -> tuple:
+    files = 0
+    size = 0
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                for name in names:
+                    files += 1
+                    size += os.path.getsize(os.path.join(root, name))
+        elif os.path.exists(path):
+            files += 1
+            size += os.path.getsize(path)
+    return files, size
+
+
+def _measure(run, track_memory: bool) -> tuple:
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        run()
+    seconds = time.perf_counter() - start
+    peak = 0
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def _result(size: int, stage: str, seconds: float, peak: int, files: int, written: int) -> dict:
+    return {
+        'size': size,
+        'stage': stage,
+        'seconds': round(seconds, 4),
+        'files': files,
+        'bytes': written,
+        'files_per_second': round(files / seconds, 1) if seconds and files else None,
+        'peak_memory': peak,
+    }
+
+
+def run_size(size: int, work_dir: str, workers: int = 0, track_memory: bool = True) -> list:
+    """
+    Benchmarks the catalog, every generator and a full generate_all over a corpus of the given size.
+    """
+    model_dir = os.path.join(work_dir, 'models')
+    schema_map = make_corpus(model_dir, size)
+    database.set_schema_provider(database.SqliteSchemaProvider(schema_map=schema_map))
+    results = []
+
+    entity_parser.clear_parse_cache()
+    catalog = None
+
+    def load_catalog():
+        nonlocal catalog
+        catalog = build_catalog(model_dir)
+
+    seconds, peak = _measure(load_catalog, track_memory)
+    results.append(_result(size, 'catalog', seconds, peak, 0, 0))
+
+    output_dir = os.path.join(work_dir, 'per_generator')
+    targets = _targets(output_dir)
+    for key, generator in GENERATORS.items():
+        options = {'workers': workers} if key in PER_MODEL_GENERATORS else {}
+        seconds, peak = _measure(lambda: generator(catalog, targets[key], **options), track_memory)
+        results.append(_result(size, key, seconds, peak, *_output_size([targets[key]])))
+
+    # end to end: schemas, parsing and discovery included
+    database.clear_schema_cache()
+    entity_parser.clear_parse_cache()
+    output_dir = os.path.join(work_dir, 'end_to_end')
+    targets = _targets(output_dir)
+    seconds, peak = _measure(lambda: generate_all(model_dir, targets, workers=workers), track_memory)
+    results.append(_result(size, 'generate_all', seconds, peak, *_output_size(targets.values())))
+
+    database.clear_schema_cache()
+    entity_parser.clear_parse_cache()
+    output_dir = os.path.join(work_dir, 'pipeline')
+    targets = _targets(output_dir)
+    seconds, peak = _measure(lambda: run_pipeline(model_dir, targets, write_workers=max(workers, 1)), track_memory)
+    results.append(_result(size, 'pipeline', seconds, peak, *_output_size(targets.values())))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='entity counts to benchmark')
+    parser.add_argument('--workers', type=int, default=0, help='worker threads of the per-model generators')
+    parser.add_argument('--results', default='benchmark_results.json', help='json file the results are saved to')
+    parser.add_argument('--work-dir', help='directory for the corpora and outputs, a temporary one by default')
+    parser.add_argument('--no-memory', action='store_true', help="don't trace memory (tracing slows the runs)")
+    args = parser.parse_args(argv)
+
+    work_root = args.work_dir or tempfile.mkdtemp(prefix='cnet_benchmark_')
+    results = []
+    try:
+        for size in args.sizes:
+            work_dir = os.path.join(work_root, str(size))
+            shutil.rmtree(work_dir, ignore_errors=True)
+            for result in run_size(size, work_dir, args.workers, not args.no_memory):
+                results.append(result)
+                print(f"{result['size']:>6} {result['stage']:<20} {result['seconds']:>9.3f}s "
+                      f"{result['files']:>7} files {result['bytes']:>11} bytes "
+                      f"{result['files_per_second'] or 0:>10.1f} files/s {result['peak_memory'] / 2 ** 20:>8.1f} MiB")
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    with open(args.results, 'w+') as results_file:
+        json.dump({
+            'generator_version': GENERATOR_VERSION,
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'workers': args.workers,
+            'results': results,
+        }, results_file, indent=1)
+    print(f"results saved to {args.results}")
+
+
+if __name__ == '__main__':
+    main()
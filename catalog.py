@@ -0,0 +1,208 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass, field
+
+from database import find_schema
+from entity_parser import EntityModel, parse_entity
+from run_stats import get_stats
+
+# entity names that clash with C# keywords or System types, so they have to be fully qualified
+QUALIFIED_MODEL_NAMES = ['delegate', 'range', 'route']
+
+# entities are parsed on first use by whichever worker renders them first
+_parse_lock = threading.Lock()
+
+
+@dataclass
+class ModelEntry:
+    name: str
+    schema: str
+    safe_name: str
+    camel_name: str
+    source_path: str
+    source_hash: str = ''
+    # the bytes of the entity file, parsed into entity the first time it is used, so the models an incremental run
+    # skips are only read and hashed
+    source: bytes = field(default=None, repr=False)
+    parsed_entity: EntityModel = field(default=None, repr=False)
+
+    @property
+    def entity(self) -> EntityModel:
+        if self.parsed_entity is None:
+            with _parse_lock:
+                if self.parsed_entity is None:
+                    with get_stats().timer('parse', 'catalog'):
+                        self.parsed_entity = parse_entity(self.source.decode('utf-8-sig', 'replace'), self.source_hash)
+                    self.source = None
+        return self.parsed_entity
+
+    @property
+    def properties(self) -> list:
+        return self.entity.properties
+
+
+class ModelCatalog:
+    """
+    Every entity of the model directory with its resolved schema, discovered once and shared by all generators.
+
+    Models whose schema can't be resolved are left out and listed in missing. A partial catalog (see subset) holds
+    only some of the models, so generators must not treat the models missing from it as deleted.
+    """
+
+    def __init__(self, model_path_dir: str, models: list, missing: list = None, partial: bool = False):
+        self.model_path_dir = model_path_dir
+        self.models = models
+        self.missing = missing or []
+        self.partial = partial
+
+    def __iter__(self):
+        return iter(self.models)
+
+    def __len__(self):
+        return len(self.models)
+
+    @property
+    def schemas(self) -> list:
+        """
+        The schemas of the catalog in the order they first appear.
+        """
+        return list(dict.fromkeys(model.schema for model in self.models))
+
+    def subset(self, names: list = None, schemas: list = None) -> 'ModelCatalog':
+        """
+        Returns a partial catalog of the models with the given names and/or in the given schemas (case insensitive).
+        """
+        names = {name.lower() for name in names} if names is not None else None
+        schemas = {schema.lower() for schema in schemas} if schemas is not None else None
+        models = [model for model in self.models
+                  if (names is None or model.name.lower() in names)
+                  and (schemas is None or model.schema.lower() in schemas)]
+        return ModelCatalog(self.model_path_dir, models, partial=True)
+
+    def update(self, source_paths) -> tuple:
+        """
+        Loads the given entity files again (e.g. after they changed on disk) and drops the ones that were deleted.
+
+        Returns the names of the models that were added or changed, and the names of the ones that were removed.
+        """
+        by_path = {model.source_path: model for model in self.models}
+        changed = []
+        removed = []
+        for source_path in source_paths:
+            model_name = os.path.splitext(os.path.basename(source_path))[0]
+            if model_name in self.missing:
+                self.missing.remove(model_name)
+            old = by_path.pop(source_path, None)
+            model = load_model(source_path) if os.path.exists(source_path) else None
+            if model is not None:
+                by_path[source_path] = model
+                if old is None or old.source_hash != model.source_hash or old.schema != model.schema:
+                    changed.append(model.name)
+            elif old is not None:
+                removed.append(old.name)
+            elif os.path.exists(source_path):
+                self.missing.append(model_name)
+        self.models = list(by_path.values())
+        self.sort()
+        return changed, removed
+
+    def stale_schema_paths(self) -> list:
+        """
+        Returns the entity files whose schema lookup changed, after the schema map was reloaded: the missing models
+        and the models that now resolve to another schema (or to none). Pass them to update to load them again.
+        """
+        missing = set(self.missing)
+        paths = [source_path for source_path in iter_model_files(self.model_path_dir)
+                 if os.path.splitext(os.path.basename(source_path))[0] in missing]
+        paths.extend(model.source_path for model in self.models if find_schema(model.name) != model.schema)
+        return paths
+
+    def sort(self):
+        """
+        Puts the models back in the order build_catalog discovers them in.
+        """
+        self.models.sort(key=lambda model: _walk_order(self.model_path_dir, model.source_path))
+
+
+def safe_model_name(model_name: str):
+    if model_name.lower() in QUALIFIED_MODEL_NAMES:
+        return f'CNET_V7_Entities.DataModels.{model_name}'
+    return model_name
+
+
+def camel_case(model_name: str):
+    return model_name[0].lower() + model_name[1:]
+
+
+def _walk_order(model_path_dir: str, source_path: str) -> tuple:
+    # sorting on (folders, file name) gives the same order as the sorted os.walk in build_catalog
+    folder, file = os.path.split(os.path.relpath(source_path, model_path_dir))
+    return (tuple(folder.split(os.sep)) if folder else ()), file
+
+
+def load_model(source_path: str):
+    """
+    Resolves the schema of one entity file and reads it, the entity is parsed when it is first used. Returns None if
+    the schema can't be found.
+    """
+    stats = get_stats()
+    model_name, _ = os.path.splitext(os.path.basename(source_path))
+    with stats.timer('schema', 'catalog'):
+        schema = find_schema(model_name)
+    if schema == -1:
+        print('file name: ', model_name, ', schema: ', schema)
+        return None
+    with stats.timer('discovery', 'catalog'):
+        with open(source_path, 'rb') as domain_file:
+            source = domain_file.read()
+        return ModelEntry(model_name, schema, safe_model_name(model_name), camel_case(model_name), source_path,
+                          hashlib.sha256(source).hexdigest(), source)
+
+
+def iter_model_files(model_path_dir: str):
+    """
+    Yields the entity files of the model directory, folders and files in sorted order.
+    """
+    for root, dirs, files in os.walk(model_path_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if os.path.splitext(file)[1] == '.cs':
+                yield os.path.join(root, file)
+
+
+def build_catalog(model_path_dir: str, names: list = None, schemas: list = None) -> ModelCatalog:
+    """
+    Walks the model directory once, resolving the schema and hashing every file in it.
+
+    With names and/or schemas (case insensitive) only the matching entities are read, and a partial catalog is
+    returned (see ModelCatalog.subset).
+    """
+    stats = get_stats()
+    names = {name.lower() for name in names} if names is not None else None
+    schemas = {schema.lower() for schema in schemas} if schemas is not None else None
+    models = []
+    missing = []
+    for source_path in iter_model_files(model_path_dir):
+        model_name = os.path.splitext(os.path.basename(source_path))[0]
+        if names is not None and model_name.lower() not in names:
+            continue
+        if schemas is not None and str(find_schema(model_name)).lower() not in schemas:
+            continue
+        model = load_model(source_path)
+        if model is None:
+            missing.append(model_name)
+        else:
+            models.append(model)
+    stats.count('models', len(models))
+    stats.count('models_missing', len(missing))
+    return ModelCatalog(model_path_dir, models, missing, partial=names is not None or schemas is not None)
+
+
+def as_catalog(models) -> ModelCatalog:
+    """
+    Lets the generators take either a ready catalog or the model directory to build one from.
+    """
+    if isinstance(models, ModelCatalog):
+        return models
+    return build_catalog(models)
@@ -0,0 +1,166 @@
+"""
+Generates the layers of the CNET V7 solution from the scaffolded entities, configured by a json file.
+
+    python cli.py                                   # every generator of the config
+    python cli.py --only dto,repository,controller
+    python cli.py --models Account,Person           # only these entities
+    python cli.py --schema Common --only dto
+    python cli.py --dry-run                         # report what would change, write nothing
+    python cli.py --check                           # the same, exiting with 1 if anything would change (for CI)
+    python cli.py --archive generated.zip           # everything into one archive instead of the output roots
+
+See cnet_automation.example.json for the config. With --models or --schema only the per-model generators run
+unless --only names others, as the managers and the mapping profile don't change when an entity is edited.
+
+pyodbc, sqlite3, tarfile and zipfile are only imported by the runs that use them. --refresh-schemas queries the
+database again, so it can't be combined with a db_context_path in the config, which reads the schemas without one.
+"""
+import argparse
+import json
+import os
+import sys
+
+DEFAULT_CONFIG = 'cnet_automation.json'
+
+# config key -> default, paths are relative to the config file
+CONFIG_DEFAULTS = {
+    'model_path': None,
+    'targets': {},
+    'generators': None,
+    'schema_snapshot_path': 'schema_snapshot.json',
+    'db_context_path': None,
+    # look up the entities missing from the DbContext in the database
+    'db_fallback': False,
+    'template_dir': None,
+    'incremental': True,
+    'workers': 8,
+    'stats_path': None,
+    # see options.DEFAULTS
+    'options': {},
+}
+
+
+def load_config(config_path: str) -> dict:
+    """
+    Reads the json config, filling in the defaults and resolving its paths against the folder of the file.
+    """
+    with open(config_path) as config_file:
+        config = {**CONFIG_DEFAULTS, **json.load(config_file)}
+    unknown = [key for key in config if key not in CONFIG_DEFAULTS]
+    if unknown:
+        raise ValueError(f"unknown config keys in {config_path}: {', '.join(unknown)}")
+    if not config['model_path']:
+        raise ValueError(f"model_path is missing from {config_path}")
+
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+
+    def resolve(path):
+        return os.path.join(base_dir, path) if path else path
+
+    for key in ['model_path', 'schema_snapshot_path', 'db_context_path', 'template_dir', 'stats_path']:
+        config[key] = resolve(config[key])
+    config['targets'] = {key: resolve(path) for key, path in config['targets'].items()}
+    return config
+
+
+def _names(values) -> list:
+    # accepts both --only a,b and --only a --only b
+    if values is None:
+        return None
+    return [name.strip() for value in values for name in value.split(',') if name.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help=f'json config file, {DEFAULT_CONFIG} by default')
+    parser.add_argument('--only', action='append', help='comma separated generator keys to run')
+    parser.add_argument('--models', action='append', help='comma separated entity names to generate')
+    parser.add_argument('--schema', action='append', help='comma separated schemas whose entities are generated')
+    parser.add_argument('--workers', type=int, help='worker threads of the per-model generators')
+    parser.add_argument('--full', action='store_true', help='render every file again, ignoring the manifests')
+    parser.add_argument('--refresh-schemas', action='store_true',
+                        help='query the database instead of the snapshot, not with a db_context_path')
+    parser.add_argument('--dry-run', action='store_true', help='only report what would change')
+    parser.add_argument('--check', action='store_true', help='dry run, exiting with 1 if any file would change')
+    parser.add_argument('--diff', action='store_true', help='with --dry-run or --check, print unified diffs')
+    parser.add_argument('--archive', help='write into this .zip, .tar, .tar.gz, .tar.bz2 or .tar.xz archive instead, '
+                                          'laid out relative to the common folder of the targets')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    config = load_config(args.config)
+    only = _names(args.only)
+    models = _names(args.models)
+    schemas = _names(args.schema)
+    workers = args.workers if args.workers is not None else config['workers']
+    if args.refresh_schemas and config['db_context_path']:
+        raise SystemExit("--refresh-schemas doesn't apply to db_context_path, the schemas are read from the DbContext")
+    if args.archive:
+        from output import archive_format
+
+        try:
+            archive_format(args.archive)
+        except ValueError as error:
+            raise SystemExit(str(error))
+
+    # imported here, so a typo in the arguments or the config fails before anything heavy is loaded
+    from Automate import GENERATORS, PER_MODEL_GENERATORS, output_root
+    from database import load_schemas
+
+    if only is None:
+        only = config['generators'] or list(config['targets'])
+        if models is not None or schemas is not None:
+            only = [key for key in only if key in PER_MODEL_GENERATORS]
+    unknown = [key for key in only if key not in GENERATORS]
+    if unknown:
+        raise SystemExit(f"unknown generators: {', '.join(unknown)} (known: {', '.join(GENERATORS)})")
+    no_target = [key for key in only if key not in config['targets']]
+    if no_target:
+        raise SystemExit(f"no target configured for: {', '.join(no_target)}")
+
+    load_schemas(config['schema_snapshot_path'], config['db_context_path'], args.refresh_schemas, config['db_fallback'])
+    if config['template_dir']:
+        from template_engine import set_template_dir
+        set_template_dir(config['template_dir'])
+    if config['options']:
+        from options import set_options
+        set_options(**config['options'])
+
+    if args.dry_run or args.check:
+        from contextlib import redirect_stdout
+        from dry_run import dry_run
+
+        with redirect_stdout(sys.stderr):
+            report = dry_run(config['model_path'], config['targets'], only, workers, models, schemas)
+        if args.diff:
+            sys.stdout.writelines(report.unified_diff())
+        print(report.summary())
+        return 1 if args.check and report.changed else 0
+
+    from Automate import generate_all
+
+    incremental = config['incremental'] and not args.full
+    if args.archive:
+        from output import ArchiveOutput
+
+        targets = config['targets']
+        output_dirs = [output_root(key, targets[key]) for key in only]
+        with ArchiveOutput(args.archive, os.path.commonpath(output_dirs)) as output:
+            catalog = generate_all(config['model_path'], config['targets'], only, workers=workers,
+                                   stats_path=config['stats_path'], output=output, models=models, schemas=schemas)
+    else:
+        catalog = generate_all(config['model_path'], config['targets'], only, incremental=incremental,
+                               workers=workers, stats_path=config['stats_path'], models=models, schemas=schemas)
+    if models is not None:
+        found = {model.name.lower() for model in catalog}
+        not_found = [name for name in models if name.lower() not in found]
+        if not_found:
+            print(f"models not found: {', '.join(not_found)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
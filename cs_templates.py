@@ -0,0 +1,994 @@
+"""
+The built in C# templates of the generators, keyed by generator.
+
+Placeholders are written {{NAME}} and filled by template_engine.Template.render. Any of them can be overridden by a
+<name>.cs.tpl file in the template directory (see template_engine.set_template_dir).
+"""
+
+DTO_TEMPLATE = '''{{USING_STATEMENTS}}
+namespace CNET_V7_Domain.DataModels.{{SCHEMA_NAME}}Schema;
+
+{{CLASS_ATTRIBUTES}}{{CLASS_MODIFIERS}}class {{MODEL_NAME}}DTO
+{
+{{PROPERTIES}}}
+'''
+
+IREPOSITORY_TEMPLATE = '''
+using CNET_V7_Entities.DataModels;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;{{EXTRA_USINGS}}
+
+namespace CNET_V7_Repository.Contracts.{{SCHEMA_NAME}}Schema
+{
+    public interface I{{MODEL_NAME}}Repository : IRepository<{{SAFE_MODEL_NAME}}>
+    {
+{{EXTRA_MEMBERS}}
+    }
+}
+    '''
+
+REPOSITORY_TEMPLATE = '''
+using CNET_V7_Repository.Contracts;
+using Microsoft.Identity.Client;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+using CNET_V7_Entities.DataModels;
+using CNET_V7_Repository.Contracts.{{SCHEMA_NAME}}Schema;
+using Microsoft.EntityFrameworkCore;
+using CNET_V7_Entities.Data;{{EXTRA_USINGS}}
+
+namespace CNET_V7_Repository.Implementation.{{SCHEMA_NAME}}Schema
+{
+    public class {{MODEL_NAME}}Repository : Repository<{{SAFE_MODEL_NAME}}>, I{{MODEL_NAME}}Repository
+    {{{EXTRA_FIELDS}}
+        public {{MODEL_NAME}}Repository(CnetV7DbContext context) : base(context)
+        {
+{{CTOR_BODY}}        }
+{{EXTRA_MEMBERS}}    }
+}
+
+        '''
+
+IREPOSITORY_MANAGER_TEMPLATE = '''
+{{USING_STATEMENTS}}
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+
+namespace CNET_V7_Repository.Contracts
+{
+    public interface IRepositoryManager
+    {
+        void Save();
+        {{DECLARATIONS}}
+    }
+}
+    '''
+
+REPOSITORY_MANAGER_TEMPLATE = '''
+using CNET_V7_Entities.Data;
+using CNET_V7_Repository.Contracts;
+{{USING_STATEMENTS}}
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+
+namespace CNET_V7_Repository.Implementation
+{
+    public class RepositoryManager : IRepositoryManager
+    {
+        private readonly CnetV7DbContext _repositoryContext;
+
+        {{LAZY_DECLARATIONS}}
+
+        public RepositoryManager(CnetV7DbContext repositoryContext)
+        {
+            _repositoryContext = repositoryContext;
+            {{LAZY_CTOR}}
+        }
+
+        public void Save() => _repositoryContext.SaveChanges();
+        {{LAZY_INSTANTIATIONS}}
+    }
+}
+    '''
+
+ISERVICE_TEMPLATE = '''
+using CNET_V7_Domain.DataModels.{{SCHEMA_NAME}}Schema;
+using CNET_V7_Entities.DataModels;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;{{EXTRA_USINGS}}
+
+namespace CNET_V7_Service.Contracts.{{SCHEMA_NAME}}Schema
+{
+    public interface I{{MODEL_NAME}}Service : IService<{{MODEL_NAME}}DTO>
+    {
+{{EXTRA_MEMBERS}}
+    }
+}'''
+
+SERVICE_TEMPLATE = '''
+using AutoMapper;
+using CNET_V7_Domain.DataModels.{{SCHEMA_NAME}}Schema;
+using CNET_V7_Entities.DataModels;
+using CNET_V7_Logger;
+using CNET_V7_Repository.Contracts;
+using CNET_V7_Service.Contracts.{{SCHEMA_NAME}}Schema;
+using CNET_V7_Service.Contracts;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+using System.Linq.Expressions;
+using CNET_V7_Domain.Misc;
+using Azure;{{EXTRA_USINGS}}
+
+namespace CNET_V7_Service.Implementation.{{SCHEMA_NAME}}Schema
+{
+    public class {{MODEL_NAME}}Service : I{{MODEL_NAME}}Service
+    {
+        private readonly IRepositoryManager _repository;
+        private readonly ILoggerManager _logger;
+        private readonly IMapper _mapper;{{EXTRA_FIELDS}}
+
+        public {{MODEL_NAME}}Service(IRepositoryManager repository, ILoggerManager logger, IMapper mapper)
+        {
+            _repository = repository;
+            _logger = logger;
+            _mapper = mapper;
+        }
+
+        public async Task<ResponseModel<{{MODEL_NAME}}DTO>> Create({{MODEL_NAME}}DTO entity)
+        {
+            try
+            {
+                //map dto to entity
+                var {{CAMEL_SAFE_MODEL_NAME}} = {{TO_ENTITY}}(entity);
+                
+                //fetch entity obj
+                var createdObj = await _repository.{{MODEL_NAME}}.Create({{CAMEL_SAFE_MODEL_NAME}});
+
+                //map fetched entity to dto
+                var returnedObj = {{TO_DTO}}(createdObj);
+                
+                //return response object
+
+                return new ResponseModel<{{MODEL_NAME}}DTO>() { Success = true, Data = returnedObj }; ;
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<{{MODEL_NAME}}DTO> () { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+
+        public async Task<ResponseModel<{{MODEL_NAME}}DTO>> Delete(int id)
+        {
+            try
+            {
+                var res = await _repository.{{MODEL_NAME}}.Delete(id);
+                var returnedObj = {{TO_DTO}}(res);
+                return new ResponseModel<{{MODEL_NAME}}DTO>() { Success = true, Data = returnedObj }; 
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<{{MODEL_NAME}}DTO>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+
+        public async Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> FindAll(bool trackChanges)
+        {
+            try
+            {
+                var result = await _repository.{{MODEL_NAME}}.FindAll(trackChanges);
+                var returnedObj = {{TO_DTOS}}(result);
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = true, Data = returnedObj };
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+
+        public async Task<ResponseModel<{{MODEL_NAME}}DTO>> FindById(int id)
+        {
+            try
+            {
+                var result = await _repository.{{MODEL_NAME}}.FindById(id);
+                var returnedObj = {{TO_DTO}}(result);
+                return new ResponseModel<{{MODEL_NAME}}DTO>() { Success = true, Data = returnedObj };
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<{{MODEL_NAME}}DTO>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+
+        public async Task<ResponseModel<{{MODEL_NAME}}DTO>> Update({{MODEL_NAME}}DTO entity)
+        {
+            try
+            {
+                var {{CAMEL_SAFE_MODEL_NAME}} = {{TO_ENTITY}}(entity);
+                var updatedObject = await _repository.{{MODEL_NAME}}.Update({{CAMEL_SAFE_MODEL_NAME}});
+                var returnedObj = {{TO_DTO}}(updatedObject);
+                return new ResponseModel<{{MODEL_NAME}}DTO>() { Success = true, Data = returnedObj }; ;
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<{{MODEL_NAME}}DTO>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+{{EXTRA_MEMBERS}}    }
+}
+            '''
+
+ISERVICE_MANAGER_TEMPLATE = '''
+{{USING_STATEMENTS}}
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+
+namespace CNET_V7_Service.Contracts
+{
+    public interface IServiceManager
+    {
+{{DECLARATIONS}}
+    }
+}
+
+    '''
+
+SERVICE_MANAGER_TEMPLATE = '''
+using AutoMapper;
+using CNET_V7_Logger;
+using CNET_V7_Repository.Contracts;
+using CNET_V7_Service.Contracts;
+{{USING_STATEMENTS}}
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+
+namespace CNET_V7_Service.Implementation
+{
+    public class ServiceManager : IServiceManager
+    {
+
+        {{LAZY_DECLARATIONS}}
+        public ServiceManager(IRepositoryManager repositoryManager, ILoggerManager logger, IMapper mapper)
+        {
+            {{LAZY_CTOR}}
+        }
+        
+        {{LAZY_INSTANTIATIONS}}
+    }
+}
+
+    '''
+
+CONTROLLER_TEMPLATE = '''using CNET_V7_Domain.DataModels.{{SCHEMA_NAME}}Schema;
+using CNET_V7_Entities.DataModels;
+using CNET_V7_Service.Contracts;
+using Microsoft.AspNetCore.Mvc;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;{{EXTRA_USINGS}}
+
+namespace CNET_V7_Presentation.BaseControllers.{{SCHEMA_NAME}}Schema
+{
+    [Route("api/[controller]")]
+    [ApiController]
+    public class {{MODEL_NAME}}Controller : ControllerBase
+    {
+        private readonly IService<{{SAFE_MODEL_NAME}}, {{MODEL_NAME}}DTO> _commonService;{{EXTRA_FIELDS}}
+
+        public {{MODEL_NAME}}Controller(IService<{{SAFE_MODEL_NAME}}, {{MODEL_NAME}}DTO> commonService{{EXTRA_CTOR_PARAMETERS}})
+        {
+            _commonService = commonService;
+{{CTOR_BODY}}        }
+
+        [HttpGet("{id}")]{{READ_BY_ID_ATTRIBUTES}}
+        public async Task<IActionResult> Get{{MODEL_NAME}}ById(int id)
+        {
+{{READ_BY_ID_PROLOGUE}}            var response = await {{FIND_BY_ID_CALL}};
+            if (response.Success) return {{READ_OK}}(response.Data);
+            return BadRequest(response.Ex.ToString());
+        }
+
+        [HttpGet]{{READ_ATTRIBUTES}}
+        public async Task<IActionResult> GetAll{{MODEL_NAME}}s()
+        {
+{{READ_PROLOGUE}}            var response = await {{FIND_ALL_CALL}};
+            if(response.Success)
+                return {{READ_OK}}(response.Data);
+            return BadRequest(response.Message);
+        }
+
+        [HttpPost]
+        public async Task<IActionResult> Create{{MODEL_NAME}}([FromBody] {{MODEL_NAME}}DTO {{PARAMETER}})
+        {
+            if ({{PARAMETER}} is null)
+                return BadRequest("{{CAMEL_MODEL_NAME}} is null");
+            var response = await _commonService.Create({{PARAMETER}});
+{{ON_CREATE}}            if (response.Success)
+                return Ok(response.Data);
+            return BadRequest(response.Ex.ToString());
+        }
+
+        [HttpPut]
+        public async Task<IActionResult> Update{{MODEL_NAME}}([FromBody] {{MODEL_NAME}}DTO {{PARAMETER}})
+        {
+            if ({{PARAMETER}} is null) return BadRequest("{{CAMEL_MODEL_NAME}} is null");
+            var response = await _commonService.Update({{PARAMETER}});
+{{ON_UPDATE}}            if(response.Success) return Ok(response.Data);
+            return BadRequest(response.Ex.ToString());
+        }
+
+        [HttpDelete("{id}")]
+        public async Task<IActionResult> Delete{{MODEL_NAME}}(int id)
+        {
+            var response = await _commonService.Delete(id);
+{{ON_DELETE}}            if (response.Success)
+                return NoContent();
+            return BadRequest(response.Ex.ToString());
+        }
+{{EXTRA_MEMBERS}}    }
+}'''
+
+MAPPING_TEMPLATE = '''
+using AutoMapper;
+{{USING_STATEMENTS}}
+using CNET_V7_Entities.DataModels;
+
+namespace CNET_V7_API.MappingProfile
+{
+    public class MappingProfile : Profile
+    {
+        public MappingProfile() {
+            CreateMap<Account, AccountDTO>().ReverseMap();
+{{CONFIGURATION}}
+        } 
+    }
+}
+
+        '''
+
+MAPPING_METHODS_TEMPLATE = '''using CNET_V7_Domain.DataModels.{{SCHEMA_NAME}}Schema;
+using CNET_V7_Entities.DataModels;
+using System.Collections.Generic;
+
+namespace CNET_V7_Service.Mappings.{{SCHEMA_NAME}}Schema
+{
+    public static class {{MODEL_NAME}}Mappings
+    {
+        public static {{MODEL_NAME}}DTO ToDto(this {{SAFE_MODEL_NAME}} entity) => entity is null ? null! : new {{MODEL_NAME}}DTO
+        {
+{{DTO_ASSIGNMENTS}}        };
+
+        public static {{SAFE_MODEL_NAME}} ToEntity(this {{MODEL_NAME}}DTO dto) => dto is null ? null! : new {{SAFE_MODEL_NAME}}
+        {
+{{ENTITY_ASSIGNMENTS}}        };
+
+        public static List<{{MODEL_NAME}}DTO> ToDtos(this IEnumerable<{{SAFE_MODEL_NAME}}> entities)
+        {
+            var dtos = entities is ICollection<{{SAFE_MODEL_NAME}}> collection
+                ? new List<{{MODEL_NAME}}DTO>(collection.Count)
+                : new List<{{MODEL_NAME}}DTO>();
+            foreach (var entity in entities)
+            {
+                dtos.Add(entity.ToDto());
+            }
+            return dtos;
+        }
+
+        public static List<{{SAFE_MODEL_NAME}}> ToEntities(this IEnumerable<{{MODEL_NAME}}DTO> dtos)
+        {
+            var entities = dtos is ICollection<{{MODEL_NAME}}DTO> collection
+                ? new List<{{SAFE_MODEL_NAME}}>(collection.Count)
+                : new List<{{SAFE_MODEL_NAME}}>();
+            foreach (var dto in dtos)
+            {
+                entities.Add(dto.ToEntity());
+            }
+            return entities;
+        }
+    }
+}
+'''
+
+JSON_CONTEXT_TEMPLATE = '''using System.Collections.Generic;
+using System.Text.Json.Serialization;
+
+namespace CNET_V7_Domain.DataModels.{{SCHEMA_NAME}}Schema;
+
+{{SERIALIZABLE_TYPES}}public partial class {{SCHEMA_NAME}}JsonContext : JsonSerializerContext
+{
+}
+'''
+
+# the templates below are snippets the generation options (see options.py) add to the per-model files, named
+# <generator>_<option>
+
+IREPOSITORY_PAGING_TEMPLATE = '''        Task<List<{{SAFE_MODEL_NAME}}>> FindPage(int page, int pageSize);
+        Task<List<{{SAFE_MODEL_NAME}}>> FindAfter({{KEY_TYPE}}? after, int pageSize);
+        IAsyncEnumerable<{{SAFE_MODEL_NAME}}> StreamAll();
+'''
+
+REPOSITORY_PAGING_TEMPLATE = '''
+        public Task<List<{{SAFE_MODEL_NAME}}>> FindPage(int page, int pageSize) =>
+            _context.Set<{{SAFE_MODEL_NAME}}>().AsNoTracking()
+                .OrderBy(e => e.{{KEY_NAME}})
+                .Skip((page - 1) * pageSize)
+                .Take(pageSize)
+                .ToListAsync();
+
+        public Task<List<{{SAFE_MODEL_NAME}}>> FindAfter({{KEY_TYPE}}? after, int pageSize)
+        {
+            var query = _context.Set<{{SAFE_MODEL_NAME}}>().AsNoTracking();
+            if (after != null)
+                query = query.Where(e => e.{{KEY_NAME}} > after);
+            return query.OrderBy(e => e.{{KEY_NAME}}).Take(pageSize).ToListAsync();
+        }
+
+        public IAsyncEnumerable<{{SAFE_MODEL_NAME}}> StreamAll() =>
+            _context.Set<{{SAFE_MODEL_NAME}}>().AsNoTracking().OrderBy(e => e.{{KEY_NAME}}).AsAsyncEnumerable();
+'''
+
+ISERVICE_PAGING_TEMPLATE = '''        Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> FindPage(int page, int pageSize);
+        Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> FindAfter({{KEY_TYPE}}? after, int pageSize);
+        IAsyncEnumerable<{{MODEL_NAME}}DTO> StreamAll(CancellationToken cancellationToken = default);
+'''
+
+SERVICE_PAGING_TEMPLATE = '''
+        // larger page sizes are clamped to this, so no request can read a whole table at once
+        public const int MaxPageSize = {{MAX_PAGE_SIZE}};
+
+        public async Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> FindPage(int page, int pageSize)
+        {
+            try
+            {
+                var result = await _repository.{{MODEL_NAME}}.FindPage(Math.Max(page, 1), Math.Clamp(pageSize, 1, MaxPageSize));
+                var returnedObj = {{TO_DTOS}}(result);
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = true, Data = returnedObj };
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+
+        public async Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> FindAfter({{KEY_TYPE}}? after, int pageSize)
+        {
+            try
+            {
+                var result = await _repository.{{MODEL_NAME}}.FindAfter(after, Math.Clamp(pageSize, 1, MaxPageSize));
+                var returnedObj = {{TO_DTOS}}(result);
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = true, Data = returnedObj };
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+
+        public async IAsyncEnumerable<{{MODEL_NAME}}DTO> StreamAll([EnumeratorCancellation] CancellationToken cancellationToken = default)
+        {
+            await foreach (var entity in _repository.{{MODEL_NAME}}.StreamAll().WithCancellation(cancellationToken))
+            {
+                yield return {{TO_DTO}}(entity);
+            }
+        }
+'''
+
+CONTROLLER_PAGING_TEMPLATE = '''
+        [HttpGet("page")]{{READ_ATTRIBUTES}}
+        public async Task<IActionResult> Get{{MODEL_NAME}}Page([FromQuery] int page = 1, [FromQuery] int pageSize = {{PAGE_SIZE}})
+        {
+{{READ_PROLOGUE}}            var response = await _serviceManager.{{CAMEL_MODEL_NAME}}Service.FindPage(page, pageSize);
+            if (response.Success)
+                return {{READ_OK}}(response.Data);
+            return BadRequest(response.Message);
+        }
+
+        // keyset paging: pass the {{KEY_NAME}} of the last row of the previous page as after
+        [HttpGet("after")]{{READ_ATTRIBUTES}}
+        public async Task<IActionResult> Get{{MODEL_NAME}}sAfter([FromQuery] {{KEY_TYPE}}? after = null, [FromQuery] int pageSize = {{PAGE_SIZE}})
+        {
+{{READ_PROLOGUE}}            var response = await _serviceManager.{{CAMEL_MODEL_NAME}}Service.FindAfter(after, pageSize);
+            if (response.Success)
+                return {{READ_OK}}(response.Data);
+            return BadRequest(response.Message);
+        }
+
+        // rows are serialized as they are read, the table is never held in memory
+        [HttpGet("stream")]
+        public IAsyncEnumerable<{{MODEL_NAME}}DTO> Stream{{MODEL_NAME}}s(CancellationToken cancellationToken) =>
+            _serviceManager.{{CAMEL_MODEL_NAME}}Service.StreamAll(cancellationToken);
+'''
+
+IREPOSITORY_PROJECTION_TEMPLATE = '''        Task<List<TResult>> FindAllAs<TResult>(Expression<Func<{{SAFE_MODEL_NAME}}, TResult>> selector);
+'''
+
+IREPOSITORY_PROJECTION_KEYED_TEMPLATE = '''        Task<TResult> FindByIdAs<TResult>({{KEY_TYPE}} id, Expression<Func<{{SAFE_MODEL_NAME}}, TResult>> selector);
+'''
+
+REPOSITORY_PROJECTION_TEMPLATE = '''
+        public Task<List<TResult>> FindAllAs<TResult>(Expression<Func<{{SAFE_MODEL_NAME}}, TResult>> selector) =>
+            _context.Set<{{SAFE_MODEL_NAME}}>().AsNoTracking().Select(selector).ToListAsync();
+'''
+
+REPOSITORY_PROJECTION_KEYED_TEMPLATE = '''
+        public Task<TResult> FindByIdAs<TResult>({{KEY_TYPE}} id, Expression<Func<{{SAFE_MODEL_NAME}}, TResult>> selector) =>
+            _context.Set<{{SAFE_MODEL_NAME}}>().AsNoTracking().Where(e => e.{{KEY_NAME}} == id).Select(selector).FirstOrDefaultAsync();
+'''
+
+ISERVICE_PROJECTION_TEMPLATE = '''        Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> FindAllDtos();
+'''
+
+ISERVICE_PROJECTION_KEYED_TEMPLATE = '''        Task<ResponseModel<{{MODEL_NAME}}DTO>> FindDtoById({{KEY_TYPE}} id);
+'''
+
+SERVICE_PROJECTION_TEMPLATE = '''
+        // selects only the columns of the DTO, so the reads below never load the navigations or track the rows
+        private static readonly Expression<Func<{{SAFE_MODEL_NAME}}, {{MODEL_NAME}}DTO>> Projection = e => new {{MODEL_NAME}}DTO
+        {
+{{PROJECTION}}        };
+
+        public async Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> FindAllDtos()
+        {
+            try
+            {
+                var returnedObj = await _repository.{{MODEL_NAME}}.FindAllAs(Projection);
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = true, Data = returnedObj };
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+'''
+
+SERVICE_PROJECTION_KEYED_TEMPLATE = '''
+        public async Task<ResponseModel<{{MODEL_NAME}}DTO>> FindDtoById({{KEY_TYPE}} id)
+        {
+            try
+            {
+                var returnedObj = await _repository.{{MODEL_NAME}}.FindByIdAs(id, Projection);
+                return new ResponseModel<{{MODEL_NAME}}DTO>() { Success = true, Data = returnedObj };
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<{{MODEL_NAME}}DTO>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+'''
+
+IREPOSITORY_BULK_TEMPLATE = '''        Task<List<{{SAFE_MODEL_NAME}}>> CreateMany(List<{{SAFE_MODEL_NAME}}> entities);
+        Task<List<{{SAFE_MODEL_NAME}}>> UpdateMany(List<{{SAFE_MODEL_NAME}}> entities);
+        Task<int> DeleteMany(IEnumerable<{{KEY_TYPE}}> ids);
+'''
+
+REPOSITORY_BULK_TEMPLATE = '''
+        public async Task<List<{{SAFE_MODEL_NAME}}>> CreateMany(List<{{SAFE_MODEL_NAME}}> entities)
+        {
+            _context.Set<{{SAFE_MODEL_NAME}}>().AddRange(entities);
+            await _context.SaveChangesAsync();
+            return entities;
+        }
+
+        public async Task<List<{{SAFE_MODEL_NAME}}>> UpdateMany(List<{{SAFE_MODEL_NAME}}> entities)
+        {
+            _context.Set<{{SAFE_MODEL_NAME}}>().UpdateRange(entities);
+            await _context.SaveChangesAsync();
+            return entities;
+        }
+
+        public async Task<int> DeleteMany(IEnumerable<{{KEY_TYPE}}> ids)
+        {
+            var entities = await _context.Set<{{SAFE_MODEL_NAME}}>().Where(e => ids.Contains(e.{{KEY_NAME}})).ToListAsync();
+            _context.Set<{{SAFE_MODEL_NAME}}>().RemoveRange(entities);
+            await _context.SaveChangesAsync();
+            return entities.Count;
+        }
+'''
+
+ISERVICE_BULK_TEMPLATE = '''        Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> CreateMany(IEnumerable<{{MODEL_NAME}}DTO> entities);
+        Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> UpdateMany(IEnumerable<{{MODEL_NAME}}DTO> entities);
+        Task<ResponseModel<int>> DeleteMany(IEnumerable<{{KEY_TYPE}}> ids);
+'''
+
+SERVICE_BULK_TEMPLATE = '''
+        // the input is split into batches of at most this many rows, each mapped in one pass and saved with one
+        // SaveChanges, the batches saved before a failing one stay saved
+        public const int MaxBatchSize = {{MAX_BATCH_SIZE}};
+
+        public async Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> CreateMany(IEnumerable<{{MODEL_NAME}}DTO> entities)
+        {
+            try
+            {
+                var returnedObj = new List<{{MODEL_NAME}}DTO>();
+                foreach (var batch in entities.Chunk(MaxBatchSize))
+                {
+                    var createdObjs = await _repository.{{MODEL_NAME}}.CreateMany({{TO_ENTITIES}}(batch));
+                    returnedObj.AddRange({{TO_DTOS}}(createdObjs));
+                }
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = true, Data = returnedObj };
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+
+        public async Task<ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>> UpdateMany(IEnumerable<{{MODEL_NAME}}DTO> entities)
+        {
+            try
+            {
+                var returnedObj = new List<{{MODEL_NAME}}DTO>();
+                foreach (var batch in entities.Chunk(MaxBatchSize))
+                {
+                    var updatedObjs = await _repository.{{MODEL_NAME}}.UpdateMany({{TO_ENTITIES}}(batch));
+                    returnedObj.AddRange({{TO_DTOS}}(updatedObjs));
+                }
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = true, Data = returnedObj };
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<IEnumerable<{{MODEL_NAME}}DTO>>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+
+        public async Task<ResponseModel<int>> DeleteMany(IEnumerable<{{KEY_TYPE}}> ids)
+        {
+            try
+            {
+                var deleted = 0;
+                foreach (var batch in ids.Chunk(MaxBatchSize))
+                {
+                    deleted += await _repository.{{MODEL_NAME}}.DeleteMany(batch);
+                }
+                return new ResponseModel<int>() { Success = true, Data = deleted };
+            }
+            catch (Exception e)
+            {
+                _logger.LogError(e.Message);
+                return new ResponseModel<int>() { Success = false, Ex = e, Message = e.Message };
+            }
+        }
+'''
+
+CONTROLLER_BULK_TEMPLATE = '''
+        [HttpPost("batch")]
+        public async Task<IActionResult> Create{{MODEL_NAME}}s([FromBody] List<{{MODEL_NAME}}DTO> dtos)
+        {
+            if (dtos is null)
+                return BadRequest("{{CAMEL_MODEL_NAME}}s is null");
+            var response = await _serviceManager.{{CAMEL_MODEL_NAME}}Service.CreateMany(dtos);
+{{ON_CREATE}}            if (response.Success)
+                return Ok(response.Data);
+            return BadRequest(response.Ex.ToString());
+        }
+
+        [HttpPut("batch")]
+        public async Task<IActionResult> Update{{MODEL_NAME}}s([FromBody] List<{{MODEL_NAME}}DTO> dtos)
+        {
+            if (dtos is null)
+                return BadRequest("{{CAMEL_MODEL_NAME}}s is null");
+            var response = await _serviceManager.{{CAMEL_MODEL_NAME}}Service.UpdateMany(dtos);
+{{ON_UPDATE_MANY}}            if (response.Success)
+                return Ok(response.Data);
+            return BadRequest(response.Ex.ToString());
+        }
+
+        [HttpDelete("batch")]
+        public async Task<IActionResult> Delete{{MODEL_NAME}}s([FromBody] List<{{KEY_TYPE}}> ids)
+        {
+            if (ids is null)
+                return BadRequest("ids is null");
+            var response = await _serviceManager.{{CAMEL_MODEL_NAME}}Service.DeleteMany(ids);
+{{ON_DELETE_MANY}}            if (response.Success)
+                return NoContent();
+            return BadRequest(response.Ex.ToString());
+        }
+'''
+
+CONTROLLER_CACHING_TEMPLATE = '''
+        // the ETag is a hash of the response body, so it only changes when the rows do and only successful reads get
+        // one. The ETag served last for each list and row is remembered as long as the output cache keeps responses,
+        // so a conditional GET matching it gets its 304 before the query runs. Writes forget the lists and the rows
+        // they change
+        private static readonly ConcurrentDictionary<string, (EntityTagHeaderValue ETag, DateTime Expires)> ServedETags = new();
+
+        private string ETagKey() =>
+            RouteData.Values.TryGetValue("id", out var id) ? $"row/{id}" : $"list{Request.Path}{Request.QueryString}";
+
+        private bool NotModified()
+        {
+            if (!ServedETags.TryGetValue(ETagKey(), out var served) || served.Expires < DateTime.UtcNow || !Matches(served.ETag))
+                return false;
+            Response.Headers.ETag = served.ETag.ToString();
+            return true;
+        }
+
+        // the body is serialized once, with the options of the API, for both the hash and the response
+        private IActionResult CachedOk(object data)
+        {
+            var options = HttpContext.RequestServices.GetRequiredService<IOptions<Microsoft.AspNetCore.Mvc.JsonOptions>>();
+            var body = JsonSerializer.SerializeToUtf8Bytes(data, options.Value.JsonSerializerOptions);
+            var etag = new EntityTagHeaderValue($"\\"{Convert.ToHexString(SHA256.HashData(body), 0, 16)}\\"");
+            ServedETags[ETagKey()] = (etag, DateTime.UtcNow.AddSeconds({{CACHE_SECONDS}}));
+            Response.Headers.ETag = etag.ToString();
+            if (Matches(etag))
+                return StatusCode(304);
+            return File(body, "application/json; charset=utf-8");
+        }
+
+        // If-None-Match is *, or a comma separated list of ETags compared weakly, so W/"x" matches "x"
+        private bool Matches(EntityTagHeaderValue etag) =>
+            Request.GetTypedHeaders().IfNoneMatch.Any(tag => tag.Equals(EntityTagHeaderValue.Any) || tag.Compare(etag, false));
+
+        // the lists are output cached under the {{SCHEMA_NAME}}.{{MODEL_NAME}} tag, each row under
+        // {{SCHEMA_NAME}}.{{MODEL_NAME}}.Rows and its own {{SCHEMA_NAME}}.{{MODEL_NAME}}/<id>
+        private void TagRow(int id) =>
+            HttpContext.Features.Get<IOutputCacheFeature>()?.Context.Tags.Add($"{{SCHEMA_NAME}}.{{MODEL_NAME}}/{id}");
+
+        // every write changes the lists, but only the rows given, or all of them when ids is null
+        private async Task InvalidateCacheAsync(IEnumerable<object> ids)
+        {
+            foreach (var key in ServedETags.Keys)
+            {
+                if (key.StartsWith("list") || (ids is null && key.StartsWith("row/")))
+                    ServedETags.TryRemove(key, out _);
+            }
+            await _outputCacheStore.EvictByTagAsync("{{SCHEMA_NAME}}.{{MODEL_NAME}}", default);
+            if (ids is null)
+            {
+                await _outputCacheStore.EvictByTagAsync("{{SCHEMA_NAME}}.{{MODEL_NAME}}.Rows", default);
+                return;
+            }
+            foreach (var id in ids)
+            {
+                ServedETags.TryRemove($"row/{id}", out _);
+                await _outputCacheStore.EvictByTagAsync($"{{SCHEMA_NAME}}.{{MODEL_NAME}}/{id}", default);
+            }
+        }
+'''
+
+REPOSITORY_COMPILED_QUERIES_TEMPLATE = '''
+        // compiled once per process, so these reads skip the LINQ translation and the query cache lookup
+        private static readonly Func<CnetV7DbContext, int, Task<{{SAFE_MODEL_NAME}}>> FindByIdQuery =
+            EF.CompileAsyncQuery((CnetV7DbContext context, int id) =>
+                context.Set<{{SAFE_MODEL_NAME}}>().FirstOrDefault(e => e.{{KEY_NAME}} == id));
+
+        private static readonly Func<CnetV7DbContext, IAsyncEnumerable<{{SAFE_MODEL_NAME}}>> FindAllNoTrackingQuery =
+            EF.CompileAsyncQuery((CnetV7DbContext context) => context.Set<{{SAFE_MODEL_NAME}}>().AsNoTracking());
+
+        public override Task<{{SAFE_MODEL_NAME}}> FindById(int id) => FindByIdQuery(_context, id);
+
+        public override async Task<IEnumerable<{{SAFE_MODEL_NAME}}>> FindAll(bool trackChanges)
+        {
+            if (trackChanges)
+                return await base.FindAll(trackChanges);
+            var entities = new List<{{SAFE_MODEL_NAME}}>();
+            await foreach (var entity in FindAllNoTrackingQuery(_context))
+            {
+                entities.Add(entity);
+            }
+            return entities;
+        }
+'''
+
+# the split_aggregates option writes every aggregate as a <generator>_partial file, the part that doesn't list the
+# models, and a <generator>_schema file per schema with the members of its models
+
+IREPOSITORY_MANAGER_PARTIAL_TEMPLATE = '''using System;
+
+namespace CNET_V7_Repository.Contracts
+{
+    public partial interface IRepositoryManager
+    {
+        void Save();
+    }
+}
+'''
+
+IREPOSITORY_MANAGER_SCHEMA_TEMPLATE = '''using CNET_V7_Repository.Contracts.{{SCHEMA_NAME}}Schema;
+
+namespace CNET_V7_Repository.Contracts
+{
+    public partial interface IRepositoryManager
+    {
+{{MEMBERS}}    }
+}
+'''
+
+REPOSITORY_MANAGER_PARTIAL_TEMPLATE = '''using CNET_V7_Entities.Data;
+using CNET_V7_Repository.Contracts;
+using System;
+
+namespace CNET_V7_Repository.Implementation
+{
+    public partial class RepositoryManager : IRepositoryManager
+    {
+        private readonly CnetV7DbContext _repositoryContext;
+
+        public RepositoryManager(CnetV7DbContext repositoryContext)
+        {
+            _repositoryContext = repositoryContext;
+{{SCHEMA_INITIALIZERS}}        }
+
+        public void Save() => _repositoryContext.SaveChanges();
+    }
+}
+'''
+
+REPOSITORY_MANAGER_SCHEMA_TEMPLATE = '''using CNET_V7_Repository.Contracts.{{SCHEMA_NAME}}Schema;
+using CNET_V7_Repository.Implementation.{{SCHEMA_NAME}}Schema;
+using System;
+
+namespace CNET_V7_Repository.Implementation
+{
+    public partial class RepositoryManager
+    {
+{{MEMBERS}}    }
+}
+'''
+
+ISERVICE_MANAGER_PARTIAL_TEMPLATE = '''using System;
+
+namespace CNET_V7_Service.Contracts
+{
+    public partial interface IServiceManager
+    {
+    }
+}
+'''
+
+ISERVICE_MANAGER_SCHEMA_TEMPLATE = '''using CNET_V7_Service.Contracts.{{SCHEMA_NAME}}Schema;
+
+namespace CNET_V7_Service.Contracts
+{
+    public partial interface IServiceManager
+    {
+{{MEMBERS}}    }
+}
+'''
+
+SERVICE_MANAGER_PARTIAL_TEMPLATE = '''using AutoMapper;
+using CNET_V7_Logger;
+using CNET_V7_Repository.Contracts;
+using CNET_V7_Service.Contracts;
+using System;
+
+namespace CNET_V7_Service.Implementation
+{
+    public partial class ServiceManager : IServiceManager
+    {
+        private readonly IRepositoryManager _repositoryManager;
+        private readonly ILoggerManager _logger;
+        private readonly IMapper _mapper;
+
+        public ServiceManager(IRepositoryManager repositoryManager, ILoggerManager logger, IMapper mapper)
+        {
+            _repositoryManager = repositoryManager;
+            _logger = logger;
+            _mapper = mapper;
+{{SCHEMA_INITIALIZERS}}        }
+    }
+}
+'''
+
+SERVICE_MANAGER_SCHEMA_TEMPLATE = '''using CNET_V7_Service.Contracts.{{SCHEMA_NAME}}Schema;
+using CNET_V7_Service.Implementation.{{SCHEMA_NAME}}Schema;
+using System;
+
+namespace CNET_V7_Service.Implementation
+{
+    public partial class ServiceManager
+    {
+{{MEMBERS}}    }
+}
+'''
+
+MAPPING_PARTIAL_TEMPLATE = '''using AutoMapper;
+
+namespace CNET_V7_API.MappingProfile
+{
+    public partial class MappingProfile : Profile
+    {
+        public MappingProfile()
+        {
+{{SCHEMA_INITIALIZERS}}        }
+    }
+}
+'''
+
+MAPPING_SCHEMA_TEMPLATE = '''using AutoMapper;
+using CNET_V7_Domain.DataModels.{{SCHEMA_NAME}}Schema;
+using CNET_V7_Entities.DataModels;
+
+namespace CNET_V7_API.MappingProfile
+{
+    public partial class MappingProfile
+    {
+        private void Configure{{SCHEMA_NAME}}Schema()
+        {
+{{MEMBERS}}        }
+    }
+}
+'''
+
+TEMPLATES = {
+    'dto': DTO_TEMPLATE,
+    'irepository': IREPOSITORY_TEMPLATE,
+    'repository': REPOSITORY_TEMPLATE,
+    'irepository_manager': IREPOSITORY_MANAGER_TEMPLATE,
+    'repository_manager': REPOSITORY_MANAGER_TEMPLATE,
+    'iservice': ISERVICE_TEMPLATE,
+    'service': SERVICE_TEMPLATE,
+    'iservice_manager': ISERVICE_MANAGER_TEMPLATE,
+    'service_manager': SERVICE_MANAGER_TEMPLATE,
+    'controller': CONTROLLER_TEMPLATE,
+    'mapping': MAPPING_TEMPLATE,
+    'mapping_methods': MAPPING_METHODS_TEMPLATE,
+    'json_context': JSON_CONTEXT_TEMPLATE,
+    'irepository_paging': IREPOSITORY_PAGING_TEMPLATE,
+    'repository_paging': REPOSITORY_PAGING_TEMPLATE,
+    'iservice_paging': ISERVICE_PAGING_TEMPLATE,
+    'service_paging': SERVICE_PAGING_TEMPLATE,
+    'controller_paging': CONTROLLER_PAGING_TEMPLATE,
+    'irepository_projection': IREPOSITORY_PROJECTION_TEMPLATE,
+    'irepository_projection_keyed': IREPOSITORY_PROJECTION_KEYED_TEMPLATE,
+    'repository_projection': REPOSITORY_PROJECTION_TEMPLATE,
+    'repository_projection_keyed': REPOSITORY_PROJECTION_KEYED_TEMPLATE,
+    'iservice_projection': ISERVICE_PROJECTION_TEMPLATE,
+    'iservice_projection_keyed': ISERVICE_PROJECTION_KEYED_TEMPLATE,
+    'service_projection': SERVICE_PROJECTION_TEMPLATE,
+    'service_projection_keyed': SERVICE_PROJECTION_KEYED_TEMPLATE,
+    'irepository_bulk': IREPOSITORY_BULK_TEMPLATE,
+    'repository_bulk': REPOSITORY_BULK_TEMPLATE,
+    'iservice_bulk': ISERVICE_BULK_TEMPLATE,
+    'service_bulk': SERVICE_BULK_TEMPLATE,
+    'controller_bulk': CONTROLLER_BULK_TEMPLATE,
+    'controller_caching': CONTROLLER_CACHING_TEMPLATE,
+    'repository_compiled_queries': REPOSITORY_COMPILED_QUERIES_TEMPLATE,
+    'irepository_manager_partial': IREPOSITORY_MANAGER_PARTIAL_TEMPLATE,
+    'irepository_manager_schema': IREPOSITORY_MANAGER_SCHEMA_TEMPLATE,
+    'repository_manager_partial': REPOSITORY_MANAGER_PARTIAL_TEMPLATE,
+    'repository_manager_schema': REPOSITORY_MANAGER_SCHEMA_TEMPLATE,
+    'iservice_manager_partial': ISERVICE_MANAGER_PARTIAL_TEMPLATE,
+    'iservice_manager_schema': ISERVICE_MANAGER_SCHEMA_TEMPLATE,
+    'service_manager_partial': SERVICE_MANAGER_PARTIAL_TEMPLATE,
+    'service_manager_schema': SERVICE_MANAGER_SCHEMA_TEMPLATE,
+    'mapping_partial': MAPPING_PARTIAL_TEMPLATE,
+    'mapping_schema': MAPPING_SCHEMA_TEMPLATE,
+}
@@ -1,13 +1,479 @@
-import pyodbc
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 
+from entity_parser import tokenize
+from run_stats import get_stats
 
-def find_schema(table_name: str, server_name: str = 'DESKTOP-9GKJ3L7\CNET_V7', database_name: str = 'CNET_V7_DB', username: str = 'sa', password: str = 'rdpass') -> str:
+# tables whose entity names were scaffolded differently from the table names (e.g. entity framework dropped the 's'
+# at the end of ranges and delegates), so they can't be found by name in INFORMATION_SCHEMA
+SCHEMA_OVERRIDES = {'cnetmedium': 'Common', 'range': 'Common', 'delegate': 'Common'}
+
+# a schema snapshot older than this (in seconds) is considered stale and is reloaded from the database
+SNAPSHOT_MAX_AGE = 24 * 60 * 60
+
+# the provider the schemas are loaded from, created on first use unless set_schema_provider was called
+_provider = None
+
+# table name (lower case) -> schema, loaded once per process by load_schema_map
+_schema_map = None
+
+# lower cased names neither the map nor the fallback of the provider know, so each is only looked up once
+_missing_tables = set()
+
+
+class SchemaProvider:
+    """
+    A backend the table -> schema map is loaded from.
+
+    Implementations return schemas title cased and table names lower cased, the same way find_schema reports them.
+    """
+
+    # identifies the database in schema snapshots, so a snapshot of one database is never used for another
+    source = ''
+
+    # SCHEMA_OVERRIDES patch up table names the database doesn't know, a DbContext maps the entity names itself
+    overrides_first = True
+
+    def fetch_schema_map(self) -> dict:
+        """
+        Returns the schema of every table of the database, keyed by the lower cased table name.
+        """
+        raise NotImplementedError
+
+    def table_schema(self, table_name: str):
+        """
+        Returns the schema of a single table, or -1 if it does not exist.
+        """
+        return self.fetch_schema_map().get(table_name.lower(), -1)
+
+    def resolve_missing(self, table_name: str):
+        """
+        Looks up a table that is not in the map, or returns -1. Only providers with a fallback do this.
+        """
+        return -1
+
+    def reload(self):
+        """
+        Reads the source of the map again, for providers whose source can change while the process runs.
+        """
+
+    def close(self):
+        """
+        Releases the connections held by the provider.
+        """
+
+
+class SqlServerSchemaProvider(SchemaProvider):
+    """
+    Reads the schemas from INFORMATION_SCHEMA on SQL Server, keeping up to pool_size open connections for reuse.
+    """
+
+    def __init__(self, server_name: str = r'DESKTOP-9GKJ3L7\CNET_V7', database_name: str = 'CNET_V7_DB',
+                 username: str = 'sa', password: str = 'rdpass', driver: str = '{SQL Server}', pool_size: int = 4):
+        self.connection_string = f"DRIVER={driver};SERVER={server_name};DATABASE={database_name};UID={username};PWD={password}"
+        self.source = f'mssql://{server_name}/{database_name}'
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        # pyodbc (and the odbc driver behind it) is only needed when a live server is actually used
+        import pyodbc
+        get_stats().count('db_connections')
+        return pyodbc.connect(self.connection_string)
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        except Exception:
+            # the connection may be broken, don't hand it out again
+            conn.close()
+            raise
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def fetch_schema_map(self) -> dict:
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT TABLE_NAME, TABLE_SCHEMA FROM INFORMATION_SCHEMA.TABLES")
+            get_stats().count('db_queries')
+            return {table_name.lower(): schema.title() for table_name, schema in cursor.fetchall()}
+
+    def table_schema(self, table_name: str):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT TABLE_SCHEMA FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = ?", table_name)
+            get_stats().count('db_queries')
+            row = cursor.fetchone()
+            return row[0].title() if row else -1
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class SqliteSchemaProvider(SchemaProvider):
+    """
+    Serves the schemas from a sqlite database (in memory by default) shaped like INFORMATION_SCHEMA.TABLES.
+
+    Meant for benchmarks and CI runs on machines without an odbc driver or a reachable SQL Server.
+    """
+
+    def __init__(self, path: str = ':memory:', schema_map: dict = None):
+        import sqlite3
+
+        self.source = f'sqlite://{path}'
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        get_stats().count('db_connections')
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tables (table_name TEXT PRIMARY KEY COLLATE NOCASE, table_schema TEXT)")
+        if schema_map:
+            self.add_tables(schema_map)
+
+    def add_tables(self, schema_map: dict):
+        """
+        Adds (or replaces) the given table -> schema entries.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO tables (table_name, table_schema) VALUES (?, ?)",
+                                   schema_map.items())
+
+    def fetch_schema_map(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT table_name, table_schema FROM tables").fetchall()
+        get_stats().count('db_queries')
+        return {table_name.lower(): schema.title() for table_name, schema in rows}
+
+    def table_schema(self, table_name: str):
+        with self._lock:
+            row = self._conn.execute("SELECT table_schema FROM tables WHERE table_name = ?", (table_name,)).fetchone()
+        get_stats().count('db_queries')
+        return row[0].title() if row else -1
+
+    def close(self):
+        self._conn.close()
+
+
+class DbContextSchemaProvider(SchemaProvider):
+    """
+    Reads the schemas from the scaffolded DbContext, without any database.
+
+    Scaffolding records the table and schema of every entity in the OnModelCreating of the DbContext
+    (entity.ToTable("Ranges", "common")), so the map is keyed by both the entity names and the table names, and
+    entities whose table name was pluralized are found by their class name. Entities without a ToTable call are in
+    the default schema (dbo, unless HasDefaultSchema says otherwise).
+
+    Entities missing from the DbContext (e.g. added to the database after scaffolding) are looked up one by one in
+    the fallback provider, if there is one. If it can't be used (no pyodbc, or the server can't be reached) they are
+    reported missing, like without a fallback.
+    """
+
+    overrides_first = False
+
+    def __init__(self, db_context_path: str, fallback: SchemaProvider = None):
+        self.db_context_path = db_context_path
+        self.fallback = fallback
+        self.reload()
+
+    def reload(self):
+        with open(self.db_context_path, 'rb') as db_context_file:
+            source = db_context_file.read()
+        # the hash makes a snapshot taken from an older version of the DbContext stale
+        self.source = f'dbcontext://{os.path.abspath(self.db_context_path)}#{hashlib.sha256(source).hexdigest()[:16]}'
+        self._source = source.decode('utf-8-sig', 'replace')
+
+    def fetch_schema_map(self) -> dict:
+        schema_map = {}
+        tables = {}
+        for entity_name, (table_name, schema) in parse_db_context(self._source).items():
+            schema_map[entity_name.lower()] = schema.title()
+            tables[table_name.lower()] = schema.title()
+        for table_name, schema in tables.items():
+            schema_map.setdefault(table_name, schema)
+        return schema_map
+
+    def resolve_missing(self, table_name: str):
+        if self.fallback is None:
+            return -1
+        try:
+            return self.fallback.table_schema(table_name)
+        except ImportError as error:
+            self._drop_fallback(error)
+        except Exception as error:
+            # pyodbc.Error, it can't be named here as pyodbc may not be installed
+            if type(error).__module__ != 'pyodbc':
+                raise
+            self._drop_fallback(error)
+        return -1
+
+    def _drop_fallback(self, error: Exception):
+        # one failed attempt is enough, the other missing entities would fail the same way
+        print(f"the database fallback of {self.db_context_path} is unavailable ({error}), "
+              f"entities missing from the DbContext are skipped")
+        self.fallback.close()
+        self.fallback = None
+
+    def close(self):
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+def parse_db_context(source: str) -> dict:
+    """
+    Returns entity name -> (table name, schema) of every modelBuilder.Entity<X>(...) of a scaffolded DbContext.
+    """
+    tokens = [token for token in tokenize(source) if token.kind not in ('comment', 'directive')]
+    texts = [token.text for token in tokens]
+    default_schema = 'dbo'
+    entities = {}
+    i = 0
+    while i < len(tokens):
+        if texts[i] == 'HasDefaultSchema' and texts[i + 1:i + 2] == ['('] and _is_string(tokens, i + 2):
+            default_schema = _string_value(texts[i + 2])
+        if texts[i] == 'Entity' and texts[i + 1:i + 2] == ['<'] and texts[i + 3:i + 5] == ['>', '(']:
+            entity_name = texts[i + 2]
+            end = _closing_paren(texts, i + 4)
+            if end is None:
+                # a truncated file, the rest of it is inside this incomplete call
+                break
+            parameter = _lambda_parameter(texts, i + 5)
+            table = None
+            depth = 0
+            for j in range(i + 4, end):
+                if texts[j] == '(':
+                    depth += 1
+                elif texts[j] == ')':
+                    depth -= 1
+                # only the entity's own builder counts: the lambdas of UsingEntity & co. are nested deeper and
+                # configure the many to many join tables
+                if depth != 1 or texts[j] not in ('ToTable', 'ToView') or texts[j - 1] != '.':
+                    continue
+                if parameter is not None and _receiver(texts, j - 1) != parameter:
+                    continue
+                if texts[j + 1] == '(' and _is_string(tokens, j + 2):
+                    table_name = _string_value(texts[j + 2])
+                    schema = None
+                    arguments = texts[j + 3:j + 7]
+                    if arguments[:1] == [','] and _is_string(tokens, j + 4):
+                        schema = _string_value(texts[j + 4])
+                    elif arguments[:3] == [',', 'schema', ':'] and _is_string(tokens, j + 6):
+                        schema = _string_value(texts[j + 6])
+                    table = (table_name, schema)
+                    break
+            entities[entity_name] = table or (entity_name, None)
+            i = end
+        i += 1
+    # HasDefaultSchema may come after the entities that rely on it
+    return {entity_name: (table_name, default_schema if schema is None else schema)
+            for entity_name, (table_name, schema) in entities.items()}
+
+
+def _lambda_parameter(texts: list, index: int):
+    # the parameter of the lambda starting at index, entity in entity => ... or (entity) => ...
+    # => is tokenized as = and >
+    if texts[index + 1:index + 3] == ['=', '>']:
+        return texts[index]
+    if texts[index:index + 1] == ['('] and texts[index + 2:index + 5] == [')', '=', '>']:
+        return texts[index + 1]
+    return None
+
+
+def _receiver(texts: list, dot_index: int) -> str:
+    # the first name of the member access chain ending at dot_index, entity in entity.HasNoKey().ToView
+    i = dot_index - 1
+    while i > 0:
+        if texts[i] in (')', '>'):
+            i = _opening_bracket(texts, i) - 1
+        elif texts[i - 1] == '.':
+            i -= 2
+        else:
+            break
+    return texts[i]
+
+
+def _opening_bracket(texts: list, close_index: int) -> int:
+    opening = '(' if texts[close_index] == ')' else '<'
+    depth = 0
+    for i in range(close_index, -1, -1):
+        if texts[i] == texts[close_index]:
+            depth += 1
+        elif texts[i] == opening:
+            depth -= 1
+            if depth == 0:
+                return i
+    return 0
+
+
+def _closing_paren(texts: list, open_index: int) -> int:
+    depth = 0
+    for i in range(open_index, len(texts)):
+        if texts[i] == '(':
+            depth += 1
+        elif texts[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+    return None
+
+
+def _is_string(tokens: list, index: int) -> bool:
+    return index < len(tokens) and tokens[index].kind == 'string'
+
+
+def _string_value(text: str) -> str:
+    if text.startswith('@'):
+        return text[2:-1].replace('""', '"')
+    return text[1:-1]
+
+
+def set_schema_provider(provider: SchemaProvider):
+    """
+    Makes find_schema load its schemas from the given provider, dropping the map loaded from the previous one.
+    """
+    global _provider
+    if _provider is not None and _provider is not provider:
+        _provider.close()
+    _provider = provider
+    clear_schema_cache()
+
+
+def get_schema_provider() -> SchemaProvider:
+    """
+    Returns the current schema provider, connecting to the default SQL Server if none was set.
+    """
+    global _provider
+    if _provider is None:
+        _provider = SqlServerSchemaProvider()
+    return _provider
+
+
+def load_schema_map(provider: SchemaProvider = None, snapshot_path: str = None, max_age: float = SNAPSHOT_MAX_AGE,
+                    refresh: bool = False) -> dict:
+    """
+    Returns the table -> schema map of the whole database, loading it with a single query the first time it is needed.
+
+    The map is kept in memory for the rest of the process. If snapshot_path is given, a fresh snapshot is used
+    instead of querying the database, and a newly queried map is saved to it for the next run.
+
+    Args:
+    provider (SchemaProvider): The provider to load the map from. Defaults to the current schema provider.
+    snapshot_path (str): Optional path of a local json snapshot of the map.
+    max_age (float): How old (in seconds) the snapshot may be before it is considered stale.
+    refresh (bool): Ignore both the in-memory map and the snapshot and query the database again.
+
+    Returns:
+    dict: The lower cased table names mapped to their title cased schema.
+    """
+    global _schema_map
+
+    if provider is not None and provider is not _provider:
+        set_schema_provider(provider)
+    provider = get_schema_provider()
+
+    if _schema_map is not None and not refresh:
+        return _schema_map
+
+    schema_map = None
+    if snapshot_path and not refresh:
+        schema_map = load_schema_snapshot(snapshot_path, max_age, provider.source)
+        if schema_map is not None:
+            get_stats().count('schema_snapshot_loads')
+
+    if schema_map is None:
+        schema_map = provider.fetch_schema_map()
+        if snapshot_path:
+            save_schema_snapshot(snapshot_path, schema_map, provider.source)
+
+    _schema_map = schema_map
+    _missing_tables.clear()
+    return _schema_map
+
+
+def load_schemas(snapshot_path: str = None, db_context_path: str = None, refresh: bool = False,
+                 db_fallback: bool = False) -> dict:
+    """
+    Loads the table -> schema map from the scaffolded DbContext if db_context_path is given, and otherwise from the
+    database (or its snapshot).
+
+    The DbContext needs no database, entities missing from it are skipped unless db_fallback is set, in which case
+    they are looked up in the database one by one.
+    """
+    if db_context_path:
+        fallback = get_schema_provider() if db_fallback else None
+        return load_schema_map(DbContextSchemaProvider(db_context_path, fallback=fallback))
+    return load_schema_map(snapshot_path=snapshot_path, refresh=refresh)
+
+
+def save_schema_snapshot(snapshot_path: str, schema_map: dict, source: str = ''):
+    """
+    Saves the table -> schema map to a local json file so the next runs don't have to query the database.
+    """
+    snapshot = {'source': source, 'created': time.time(), 'schemas': schema_map}
+    with open(snapshot_path, 'w+') as snapshot_file:
+        json.dump(snapshot, snapshot_file, indent=1, sort_keys=True)
+
+
+def load_schema_snapshot(snapshot_path: str, max_age: float = SNAPSHOT_MAX_AGE, source: str = ''):
+    """
+    Returns the table -> schema map saved in the snapshot, or None if it is missing, stale or from another database.
+    """
+    if not os.path.exists(snapshot_path):
+        return None
+    try:
+        with open(snapshot_path) as snapshot_file:
+            snapshot = json.load(snapshot_file)
+    except ValueError:
+        return None
+
+    if snapshot.get('source') != source:
+        return None
+    if max_age is not None and time.time() - snapshot.get('created', 0) > max_age:
+        return None
+    return snapshot['schemas']
+
+
+def clear_schema_cache():
+    """
+    Forgets the in-memory table -> schema map so the next lookup loads it again.
+    """
+    global _schema_map
+    _schema_map = None
+    _missing_tables.clear()
+
+
+def reload_schemas():
+    """
+    Re-reads the source of the current provider (e.g. a DbContext that was edited) and forgets the map and the
+    missing tables, so long running processes (watch mode) pick up tables that were added since they started.
+    """
+    if _provider is not None:
+        _provider.reload()
+    clear_schema_cache()
+
+
+def find_schema(table_name: str, server_name: str = r'DESKTOP-9GKJ3L7\CNET_V7', database_name: str = 'CNET_V7_DB', username: str = 'sa', password: str = 'rdpass') -> str:
     """
     Returns the schema of the specified table if it exists, or -1 if it does not.
 
+    The lookup is served from the table -> schema map loaded by load_schema_map, so only the first call of a run
+    touches the database. The connection arguments are only used when no schema provider was set yet.
+
     Args:
     table_name (str): The name of the table to retrieve the schema for.
-    server_name (str): The name of the server where the SQL Server instance is running. Defaults to 'DESKTOP-9GKJ3L7\CNET_V7'.
+    server_name (str): The name of the server where the SQL Server instance is running. Defaults to 'DESKTOP-9GKJ3L7\\CNET_V7'.
     database_name (str): The name of the SQL Server database to connect to. Defaults to 'test_v7'.
     username (str): The username to use for SQL Server authentication. Defaults to 'sa'.
     password (str): The password to use for SQL Server authentication. Defaults to 'rdpass'.
@@ -16,28 +482,25 @@ def find_schema(table_name: str, server_name: str = 'DESKTOP-9GKJ3L7\CNET_V7', d
     str: The schema of the table as a string, or -1 if the table does not exist.
     """
 
+    key = table_name.lower()
     # for tables range and delegate the table have 's' at the end so we should return like this for the cnetmedium for unknowingly entity framework scaffold like this
-    if table_name.lower() in ['cnetmedium', 'range', 'delegate']:
-        return 'Common'
-
-    # Set up connection string
-    connection_string = f"DRIVER={{SQL Server}};SERVER={server_name};DATABASE={database_name};UID={username};PWD={password}"
-
-    conn = pyodbc.connect(connection_string)
-    cursor = conn.cursor()
-
-    # check if the table exists
-    query = f"SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = '{table_name}'"
-    cursor.execute(query)
-
-    if cursor.fetchone():
-        # table exists, retrieve schema
-        query = f"SELECT TABLE_SCHEMA FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = '{table_name}'"
-        cursor.execute(query)
-        schema = cursor.fetchone()[0]
-        conn.close()
-        return schema.title()
-    else:
-        # table does not exist
-        conn.close()
+    if key in SCHEMA_OVERRIDES and (_provider is None or _provider.overrides_first):
+        return SCHEMA_OVERRIDES[key]
+
+    if _provider is None:
+        set_schema_provider(SqlServerSchemaProvider(server_name, database_name, username, password))
+
+    schema_map = load_schema_map()
+    if key in schema_map:
+        return schema_map[key]
+    # a DbContext map wins over the overrides, they only fill in the names it doesn't have
+    if key in SCHEMA_OVERRIDES:
+        return SCHEMA_OVERRIDES[key]
+    if key in _missing_tables:
         return -1
+    schema = get_schema_provider().resolve_missing(table_name)
+    if schema == -1:
+        _missing_tables.add(key)
+    else:
+        schema_map[key] = schema
+    return schema
@@ -0,0 +1,121 @@
+"""
+Renders the selected generators in memory and reports what a real run would change in the output roots.
+
+Nothing is written: the rendered files are compared with the ones on disk, and the files a generator recorded in
+its manifest by an earlier incremental run but would not write anymore (e.g. of deleted entities) are reported as
+removed.
+
+    python dry_run.py            # summary
+    python dry_run.py --diff     # unified diffs
+    python dry_run.py --check    # exits with 1 if anything would change, for pull request checks
+"""
+import argparse
+import difflib
+import os
+import sys
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+
+from Automate import GENERATORS, generate_all, output_root
+from manifest import Manifest
+from output import ENCODING, MemoryOutput
+
+
+@dataclass
+class DryRunReport:
+    # path -> rendered content, of every file the run would write
+    files: dict
+    added: list = field(default_factory=list)
+    modified: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+    def summary(self) -> str:
+        lines = [f"A {path}" for path in self.added]
+        lines += [f"M {path}" for path in self.modified]
+        lines += [f"D {path}" for path in self.removed]
+        lines.append(f"{len(self.added)} added, {len(self.modified)} modified, {len(self.removed)} removed, "
+                     f"{self.unchanged} unchanged")
+        return '\n'.join(lines)
+
+    def unified_diff(self, context: int = 3):
+        """
+        Yields the lines of a unified diff of every added, modified and removed file.
+        """
+        for path in self.added:
+            yield from difflib.unified_diff([], self.files[path].splitlines(True), '/dev/null', path, n=context)
+        for path in self.modified:
+            yield from difflib.unified_diff(_read(path).splitlines(True), self.files[path].splitlines(True),
+                                            path, path, n=context)
+        for path in self.removed:
+            yield from difflib.unified_diff(_read(path).splitlines(True), [], path, '/dev/null', n=context)
+
+
+def _read(path: str) -> str:
+    # text mode, so the line endings compare the same way they were written
+    with open(path, encoding=ENCODING, errors='replace') as existing_file:
+        return existing_file.read()
+
+
+def dry_run(model_path_dir: str, targets: dict, only: list = None, workers: int = 0, models: list = None,
+            schemas: list = None) -> DryRunReport:
+    """
+    Runs the selected generators (see generate_all) into memory and compares their files with the output roots.
+
+    With models or schemas only those entities are rendered, so no file is reported as removed.
+    """
+    output = MemoryOutput()
+    catalog = generate_all(model_path_dir, targets, only, workers=workers, output=output, models=models,
+                           schemas=schemas)
+    files = {os.path.normpath(path): content for path, content in output.files.items()}
+    report = DryRunReport(files)
+
+    for path in sorted(files):
+        try:
+            existing = _read(path)
+        except FileNotFoundError:
+            report.added.append(path)
+            continue
+        if existing == files[path]:
+            report.unchanged += 1
+        else:
+            report.modified.append(path)
+
+    selected = only if only is not None else list(targets)
+    removed = set()
+    for key in GENERATORS:
+        if key not in selected or catalog.partial:
+            continue
+        for path in Manifest(output_root(key, targets[key])).output_paths(key):
+            if path not in files and os.path.exists(path):
+                removed.add(path)
+    removed.update(os.path.normpath(path) for path in output.removed if os.path.exists(path))
+    report.removed = sorted(removed)
+    return report
+
+
+def main(argv=None):
+    import main as settings
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--diff', action='store_true', help='print unified diffs instead of a summary')
+    parser.add_argument('--check', action='store_true', help='exit with 1 if any file would change')
+    args = parser.parse_args(argv)
+
+    settings.configure()
+    # the generators' progress messages go to stderr, so the diff can be piped into a patch
+    with redirect_stdout(sys.stderr):
+        report = dry_run(settings.model_path, settings.targets, settings.selected_generators,
+                         settings.generation_workers)
+    if args.diff:
+        sys.stdout.writelines(report.unified_diff())
+    print(report.summary())
+    return 1 if args.check and report.changed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
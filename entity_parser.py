@@ -0,0 +1,303 @@
+"""
+A small tokenizer and parser for the entity classes entity framework scaffolds into CNET_V7_Entities/DataModels.
+
+It understands just enough C# for those files: usings, preprocessor directives, the namespace, one class with its
+attributes, and its auto properties. Constructors, methods and fields are recognised and skipped.
+"""
+import hashlib
+import re
+from dataclasses import dataclass, field
+
+_token_pattern = re.compile(r'''
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<directive>(?<![^\n])[ \t]*\#[^\n]*)
+  | (?P<string>@"(?:[^"]|"")*"|"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<number>\d[\w.]*)
+  | (?P<ident>@?[A-Za-z_]\w*)
+  | (?P<space>[^\S\n]+|\n)
+  | (?P<punct>.)
+''', re.VERBOSE | re.DOTALL)
+
+MODIFIERS = {'public', 'private', 'protected', 'internal', 'virtual', 'static', 'override', 'abstract', 'sealed',
+             'partial', 'new', 'readonly', 'required', 'extern', 'unsafe', 'volatile'}
+
+COLLECTION_TYPES = ('ICollection<', 'IList<', 'List<', 'HashSet<', 'IEnumerable<', 'ISet<')
+
+_BRACKETS = {'{': '}', '(': ')', '[': ']'}
+
+# file hash -> parsed entity, so unchanged files are parsed only once per process
+_parse_cache = {}
+
+
+@dataclass
+class Token:
+    kind: str
+    text: str
+    start: int
+    end: int
+
+
+@dataclass
+class EntityProperty:
+    name: str
+    type: str
+    modifiers: list = field(default_factory=list)
+    accessors: str = '{ get; set; }'
+    initializer: str = None
+    attributes: list = field(default_factory=list)
+    comments: list = field(default_factory=list)
+
+    @property
+    def virtual(self) -> bool:
+        return 'virtual' in self.modifiers
+
+    @property
+    def nullable(self) -> bool:
+        return self.type.endswith('?')
+
+    @property
+    def navigation(self) -> bool:
+        # entity framework scaffolds every navigation (and nothing else) as virtual
+        return self.virtual
+
+    @property
+    def settable(self) -> bool:
+        # whether an object initializer outside the class can set it
+        match = re.search(r'(\w+\s+)?\b(?:set|init)\b', self.accessors)
+        return match is not None and (match.group(1) or '').strip() not in ('private', 'protected')
+
+    @property
+    def collection(self) -> bool:
+        return self.type.startswith(COLLECTION_TYPES)
+
+
+@dataclass
+class EntityModel:
+    class_name: str = None
+    namespace: str = None
+    header: list = field(default_factory=list)
+    class_modifiers: list = field(default_factory=list)
+    class_attributes: list = field(default_factory=list)
+    class_comments: list = field(default_factory=list)
+    properties: list = field(default_factory=list)
+
+    @property
+    def scalar_properties(self) -> list:
+        """
+        The properties that map to a column, i.e. everything but the navigations.
+        """
+        return [entity_property for entity_property in self.properties if not entity_property.navigation]
+
+    @property
+    def navigation_properties(self) -> list:
+        return [entity_property for entity_property in self.properties if entity_property.navigation]
+
+
+def tokenize(source: str) -> list:
+    """
+    Splits C# source into tokens, dropping the whitespace.
+    """
+    return [Token(match.lastgroup, match.group(), match.start(), match.end())
+            for match in _token_pattern.finditer(source) if match.lastgroup != 'space']
+
+
+class _Parser:
+    def __init__(self, source: str):
+        self.source = source
+        self.tokens = tokenize(source)
+        self.position = 0
+        self.entity = EntityModel()
+
+    def peek(self, offset: int = 0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def take(self) -> Token:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def at(self, text: str, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token is not None and token.kind != 'string' and token.text == text
+
+    def skip_balanced(self) -> Token:
+        """
+        Skips the bracketed group starting at the current token and returns its closing token.
+        """
+        if self.peek() is None:
+            return self.tokens[-1]
+        closing = [_BRACKETS[self.take().text]]
+        while closing and self.peek() is not None:
+            token = self.take()
+            if token.kind == 'punct':
+                if token.text in _BRACKETS:
+                    closing.append(_BRACKETS[token.text])
+                elif token.text == closing[-1]:
+                    closing.pop()
+                    if not closing:
+                        return token
+        return self.tokens[-1]
+
+    def skip_to_semicolon(self) -> Token:
+        while self.peek() is not None:
+            if self.at(';'):
+                return self.take()
+            if self.peek().text in _BRACKETS and self.peek().kind == 'punct':
+                self.skip_balanced()
+            else:
+                self.take()
+        return self.tokens[-1]
+
+    def text(self, first: Token, last: Token) -> str:
+        return self.source[first.start:last.end]
+
+    def leading_trivia(self):
+        """
+        Collects the comments and attributes in front of a declaration.
+        """
+        comments = []
+        attributes = []
+        while self.peek() is not None:
+            token = self.peek()
+            if token.kind == 'comment':
+                comments.append(self.take().text)
+            elif token.kind == 'directive':
+                self.entity.header.append(self.take().text.strip())
+            elif self.at('['):
+                first = token
+                attributes.append(self.text(first, self.skip_balanced()))
+            else:
+                break
+        return comments, attributes
+
+    def parse(self) -> EntityModel:
+        while self.peek() is not None:
+            comments, attributes = self.leading_trivia()
+            token = self.peek()
+            if token is None:
+                break
+            if token.text == 'using':
+                first = self.take()
+                self.entity.header.append(self.text(first, self.skip_to_semicolon()))
+            elif token.text == 'namespace':
+                self.take()
+                names = []
+                while self.peek() is not None and not (self.at(';') or self.at('{')):
+                    names.append(self.take().text)
+                self.entity.namespace = ''.join(names)
+                # a block scoped namespace is simply entered, its closing brace is skipped below
+                self.take()
+            elif token.text in MODIFIERS or token.text in ('class', 'record'):
+                modifiers = []
+                while self.peek() is not None and self.peek().text in MODIFIERS:
+                    modifiers.append(self.take().text)
+                if self.at('class') or self.at('record'):
+                    self.take()
+                    if self.entity.class_name is None:
+                        self.entity.class_name = self.take().text
+                        self.entity.class_modifiers = modifiers
+                        self.entity.class_attributes = attributes
+                        self.entity.class_comments = comments
+                        # skip the base list, the generators don't use it
+                        while self.peek() is not None and not self.at('{'):
+                            self.take()
+                        self.parse_class_body()
+                    else:
+                        while self.peek() is not None and not self.at('{'):
+                            self.take()
+                        self.skip_balanced()
+                else:
+                    self.skip_to_semicolon()
+            else:
+                self.take()
+        return self.entity
+
+    def parse_class_body(self):
+        self.take()  # {
+        while self.peek() is not None:
+            comments, attributes = self.leading_trivia()
+            if self.peek() is None or self.at('}'):
+                break
+            self.parse_member(comments, attributes)
+        if self.peek() is not None:
+            self.take()  # }
+
+    def parse_member(self, comments: list, attributes: list):
+        modifiers = []
+        while self.peek() is not None and self.peek().text in MODIFIERS:
+            modifiers.append(self.take().text)
+        declaration = []
+        angle_depth = 0
+        while self.peek() is not None:
+            token = self.peek()
+            if token.text == '<':
+                angle_depth += 1
+            elif token.text == '>':
+                angle_depth -= 1
+            elif angle_depth == 0 and token.kind == 'punct' and token.text in '({;=}':
+                break
+            elif token.text in ('class', 'record', 'struct', 'enum', 'interface') and token.kind == 'ident':
+                # a nested type, skip it whole
+                while self.peek() is not None and not self.at('{'):
+                    self.take()
+                self.skip_balanced()
+                return
+            declaration.append(self.take())
+
+        terminator = self.peek()
+        if terminator is None or terminator.text == '}':
+            return
+        if terminator.text == '(':
+            # constructor or method: skip the parameters and the body or expression
+            self.skip_balanced()
+            while self.peek() is not None and not (self.at('{') or self.at(';') or self.at('=')):
+                self.take()
+            if self.at('{'):
+                self.skip_balanced()
+            else:
+                self.skip_to_semicolon()
+            return
+        if terminator.text in (';', '=') or len(declaration) < 2:
+            # a field (or something the generators don't care about)
+            self.skip_to_semicolon()
+            return
+
+        # an auto property: <type> <name> { accessors } [= initializer;]
+        name = declaration[-1]
+        property_type = self.text(declaration[0], declaration[-2])
+        accessors_start = self.peek()
+        accessors = self.text(accessors_start, self.skip_balanced())
+        initializer = None
+        if self.at('='):
+            self.take()
+            initializer_start = self.peek()
+            end = self.skip_to_semicolon()
+            initializer = self.source[initializer_start.start:end.start].strip()
+        elif self.at(';'):
+            self.take()
+        self.entity.properties.append(EntityProperty(name.text, property_type, modifiers, accessors, initializer,
+                                                     attributes, comments))
+
+
+def parse_entity(source: str, source_hash: str = None) -> EntityModel:
+    """
+    Parses the source of a scaffolded entity file, reusing the result for sources with the same hash.
+    """
+    if source_hash is None:
+        source_hash = hashlib.sha256(source.encode('utf-8')).hexdigest()
+    entity = _parse_cache.get(source_hash)
+    if entity is None:
+        entity = _Parser(source).parse()
+        _parse_cache[source_hash] = entity
+    return entity
+
+
+def parse_entity_file(path: str) -> EntityModel:
+    with open(path, 'rb') as entity_file:
+        source = entity_file.read()
+    return parse_entity(source.decode('utf-8-sig', 'replace'), hashlib.sha256(source).hexdigest())
+
+
+def clear_parse_cache():
+    _parse_cache.clear()
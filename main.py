@@ -1,6 +1,9 @@
-from Automate import create_dto, create_irepositories, create_irepository_manager, create_irepository_implementation, \
-    create_repository_manager, create_iservice_manager, create_iservice, create_service_manager, \
-    create_iservice_implementation, create_controllers, configure_mapping
+from Automate import generate_all
+from pipeline import run_pipeline
+from database import load_schemas
+from options import set_options
+from run_stats import get_stats, profiling
+from template_engine import set_template_dir
 
 model_path = r"D:\LAB\CNET\CNET_V7\CNET_V7_Entities\DataModels"
 
@@ -18,8 +21,18 @@ create_irepository_implementation_root = r'C:\Users\mahto\Desktop\test'
 create_iservice_implementation_root = r'C:\Users\mahto\Desktop\test'
 
 controller_root = r'C:\Users\mahto\Desktop\test'
+mapping_methods_root = r'C:\Users\mahto\Desktop\test'
 mapping_file_path = r'C:\Users\mahto\Desktop\test\MappingProfile.cs'
 
+# local copy of the table -> schema map, refreshed from the database once it is older than a day
+schema_snapshot_path = 'schema_snapshot.json'
+
+# the scaffolded DbContext, when set the schemas are read from its ToTable calls without any database
+db_context_path = None
+# db_context_path = r"D:\LAB\CNET\CNET_V7\CNET_V7_Entities\Data\CnetV7DbContext.cs"
+# query the database for the entities missing from the DbContext, otherwise they are skipped
+db_fallback = False
+
 # create_irepository_root_path = r"C:\Users\mahto\OneDrive\Documents\MAIN LAB\V7\CNET_V7_Repository.Contracts"
 
 # create_iservice_root_path = r"C:\Users\mahto\OneDrive\Documents\MAIN LAB\V7\CNET_V7_Service.Contracts"
@@ -40,26 +53,88 @@ mapping_file_path = r'C:\Users\mahto\Desktop\test\MappingProfile.cs'
 
 # controller_root = r'C:\Users\mahto\OneDrive\Documents\MAIN LAB\V7\CNET_V7_Presentation\BaseControllers'
 
-if __name__ == '__main__':
-
-    create_dto(model_path, created_dto_root_path)
-
-    # create_irepositories(model_path, create_irepository_root_path)
-
-    # create_irepository_implementation(model_path, create_irepository_implementation_root)
+# mapping_methods_root = r'C:\Users\mahto\OneDrive\Documents\MAIN LAB\V7\CNET_V7_Service.Implementation\Mappings'
+
+targets = {
+    'dto': created_dto_root_path,
+    'irepository': create_irepository_root_path,
+    'repository': create_irepository_implementation_root,
+    'irepository_manager': irepository_manager_create_path,
+    'repository_manager': repository_manager_create_path,
+    'iservice': create_iservice_root_path,
+    'service': create_iservice_implementation_root,
+    'iservice_manager': iservice_manager_create_path,
+    'service_manager': service_manager_create_path,
+    'controller': controller_root,
+    'mapping': mapping_file_path,
+    'mapping_methods': mapping_methods_root,
+    # next to the DTOs, one JsonSerializerContext per schema folder
+    'json_context': created_dto_root_path,
+}
+
+# the generators to run, the model directory is walked and the schemas are resolved only once for all of them
+selected_generators = [
+    'dto',
+    # 'irepository',
+    # 'repository',
+    # 'irepository_manager',
+    # 'repository_manager',
+    # 'iservice',
+    # 'service',
+    # 'iservice_manager',
+    # 'service_manager',
+    # 'controller',
+    # 'mapping',
+    # 'mapping_methods',
+    # 'json_context',
+]
+
+# directory of <generator>.cs.tpl files overriding the built in templates, template_engine.export_templates writes
+# the built in ones there as a starting point
+template_dir = None
+
+# optional features of the generated code, see options.DEFAULTS, e.g. {'mapping': 'explicit'} maps with the static
+# methods of the mapping_methods generator instead of AutoMapper
+generation_options = {}
+
+# python dry_run.py reports what a run with these settings would change, without writing anything
+
+# only render again the files whose model, schema or template changed since the last run (see manifest.py)
+incremental_generation = True
+
+# render and write the per-model files on this many threads, the output roots are on a slow share so writes overlap
+generation_workers = 8
+
+# run discovery, schema lookups, rendering and writes as an overlapping pipeline (see pipeline.py) instead of one
+# generator after the other, every file is rendered but only the changed ones are written
+pipelined_generation = False
+
+# the run statistics (timings per generator and stage, db round trips, files and bytes written) are saved here
+stats_path = 'generation_stats.json'
+
+# set to a file name to profile the run with cProfile (read it with pstats), trace_memory records its peak memory
+cprofile_path = None
+trace_memory = False
+
+
+def configure():
+    """
+    Applies the settings above that every entry point shares: schemas, template directory and generation options.
+    """
+    load_schemas(schema_snapshot_path, db_context_path, db_fallback=db_fallback)
+    if template_dir:
+        set_template_dir(template_dir)
+    set_options(**generation_options)
 
-    # create_irepository_manager(model_path, irepository_manager_create_path)
 
-    # create_repository_manager(model_path, repository_manager_create_path)
-
-    # create_iservice(model_path, create_iservice_root_path)
-
-    # create_iservice_implementation(model_path, create_iservice_implementation_root)
-
-    # create_iservice_manager(model_path, iservice_manager_create_path)
-
-    # create_service_manager(model_path, service_manager_create_path)
+if __name__ == '__main__':
 
-    # create_controllers(model_path, controller_root)
+    configure()
 
-    # configure_mapping(model_path, mapping_file_path)
+    with profiling(cprofile_path, trace_memory):
+        if pipelined_generation:
+            run_pipeline(model_path, targets, only=selected_generators, write_workers=generation_workers)
+        else:
+            generate_all(model_path, targets, only=selected_generators, incremental=incremental_generation,
+                         workers=generation_workers)
+    get_stats().save(stats_path)
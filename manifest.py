@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+
+# bump whenever a change to the generators alters their output for the same model and template
+GENERATOR_VERSION = '3'
+
+MANIFEST_FILE_NAME = '.cnet_manifest.json'
+
+
+def content_hash(*parts) -> str:
+    """
+    Returns a stable hash of the given parts (strings, or anything with a stable str()).
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    The hashes of the inputs every generated file of an output root was last rendered from.
+
+    It is kept as a json file in the output root, so a later run can skip the files whose inputs did not change.
+    Entries are grouped per generator, as several generators can share the same output root.
+    """
+
+    def __init__(self, output_root: str):
+        self.path = os.path.join(output_root, MANIFEST_FILE_NAME)
+        self.output_root = output_root
+        self.generators = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as manifest_file:
+                    manifest = json.load(manifest_file)
+            except ValueError:
+                manifest = {}
+            if manifest.get('version') == GENERATOR_VERSION:
+                self.generators = manifest.get('generators', {})
+
+    def _relative(self, output_path: str) -> str:
+        return os.path.relpath(output_path, self.output_root).replace(os.sep, '/')
+
+    def is_current(self, generator: str, output_path: str, key: str) -> bool:
+        """
+        Whether output_path was rendered from the inputs hashed to key and is still on disk.
+        """
+        entry = self.generators.get(generator, {}).get(self._relative(output_path))
+        return entry == key and os.path.exists(output_path)
+
+    def output_paths(self, generator: str) -> list:
+        """
+        The paths of the files the generator last recorded.
+        """
+        return [os.path.normpath(os.path.join(self.output_root, relative_path))
+                for relative_path in self.generators.get(generator, {})]
+
+    def record(self, generator: str, output_path: str, key: str):
+        self.generators.setdefault(generator, {})[self._relative(output_path)] = key
+
+    def prune(self, generator: str, output_paths):
+        """
+        Drops the entries of the generator that are not among output_paths (e.g. of deleted models).
+        """
+        keep = {self._relative(output_path) for output_path in output_paths}
+        entries = self.generators.get(generator, {})
+        for relative_path in [path for path in entries if path not in keep]:
+            del entries[relative_path]
+
+    def save(self):
+        with open(self.path, 'w+') as manifest_file:
+            json.dump({'version': GENERATOR_VERSION, 'generators': self.generators}, manifest_file, indent=1,
+                      sort_keys=True)
@@ -0,0 +1,88 @@
+"""
+The optional features of the generated C# code, all off by default so the output stays what it always was.
+
+Options are set once per run (see set_options) and are part of the manifest keys, so changing one renders the
+affected files again.
+"""
+import json
+
+# option -> default
+DEFAULTS = {
+    # 'automapper' maps through IMapper and the MappingProfile, 'explicit' through the static ToDto/ToEntity methods
+    # of the mapping_methods generator
+    'mapping': 'automapper',
+    # adds FindPage (offset), FindAfter (keyset on the integral Id) and StreamAll (IAsyncEnumerable) to the
+    # repositories, services and controllers of the entities with an Id
+    'paging': False,
+    # adds FindAllDtos and FindDtoById to the services, which select only the columns of the DTO without tracking
+    # (through FindAllAs/FindByIdAs of the repositories), and points the read actions of the controllers at them.
+    # FindDtoById and FindByIdAs are only added for the entities with an integral Id
+    'projection': False,
+    # adds CreateMany, UpdateMany and DeleteMany (by Id) to the repositories, services and controllers, saving each
+    # batch of at most max_batch_size rows with one SaveChanges
+    'bulk': False,
+    'max_batch_size': 1000,
+    # overrides FindById and the no-tracking FindAll of the repositories with EF.CompileAsyncQuery delegates. Needs
+    # Repository<T> to declare them virtual Task<T> FindById(int id) and Task<IEnumerable<T>> FindAll(bool)
+    'compiled_queries': False,
+    # the schemas ('*' for all) whose controllers tag their successful GET responses with an ETag hashed from the
+    # body, answering a matching If-None-Match with 304 (without querying, if the ETag was served within
+    # cache_seconds), and output cache them for cache_seconds. Writes through the controller evict the lists and the
+    # rows they changed. The default output cache store and the served ETags are per process, so a scaled out API
+    # needs a shared IOutputCacheStore, and the host must call AddOutputCache() and UseOutputCache()
+    'caching': [],
+    'cache_seconds': 60,
+    # page size of the paged controller actions when the request doesn't give one
+    'page_size': 50,
+    # the services clamp every requested page size to this
+    'max_page_size': 100,
+    # 'lazy' creates a Lazy<T> per entity when a manager is constructed, 'field' a null field per entity that the
+    # accessor fills on first use, so constructing a manager costs the same however many entities there are. The
+    # field accessors are not thread safe, which the managers don't need as they are scoped to one request
+    'manager_accessors': 'lazy',
+    # writes the managers and the mapping profile as partial classes, the file of the target holding the parts that
+    # don't list models and a <name>.<schema>.cs file next to it the members of one schema, so a model change only
+    # touches the file of its schema. Schema files no longer needed (also all of them once this is off) are deleted
+    'split_aggregates': False,
+}
+
+# allowed values of the options that are a choice
+CHOICES = {
+    'mapping': ('automapper', 'explicit'),
+    'manager_accessors': ('lazy', 'field'),
+}
+
+_options = dict(DEFAULTS)
+
+
+def set_options(**options):
+    """
+    Sets the given options for the rest of the process, the others keep their current value.
+    """
+    unknown = [name for name in options if name not in DEFAULTS]
+    if unknown:
+        raise ValueError(f"unknown generation options: {', '.join(unknown)}")
+    for name, value in options.items():
+        if type(value) is not type(DEFAULTS[name]):
+            raise ValueError(f"{name} must be a {type(DEFAULTS[name]).__name__}, not {value!r}")
+        if name.endswith(('_size', '_seconds')) and value < 1:
+            raise ValueError(f"{name} must be at least 1, not {value}")
+        if name in CHOICES and value not in CHOICES[name]:
+            raise ValueError(f"{name} must be one of {', '.join(CHOICES[name])}, not {value!r}")
+    _options.update(options)
+
+
+def reset_options():
+    _options.clear()
+    _options.update(DEFAULTS)
+
+
+def get_option(name: str):
+    return _options[name]
+
+
+def options_key() -> str:
+    """
+    A stable string of the current options, for the manifest keys.
+    """
+    return json.dumps(_options, sort_keys=True)
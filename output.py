@@ -0,0 +1,280 @@
+import io
+import os
+import threading
+import time
+
+# the entity files are read as utf-8, so the generated files are written as utf-8 too (with a BOM, like entity
+# framework scaffolds them), whatever the locale, and any character of an entity survives into its DTO
+ENCODING = 'utf-8-sig'
+
+# archive extension -> format, see ArchiveOutput
+ARCHIVE_FORMATS = {'.zip': 'zip', '.tar': 'tar', '.tar.gz': 'gz', '.tgz': 'gz', '.tar.bz2': 'bz2', '.tar.xz': 'xz'}
+
+
+class FileSystemOutput:
+    """
+    Writes the generated files to disk so that unchanged files are never touched.
+
+    Every file is rendered into a staging file next to its target and compared with the bytes already on disk. Only
+    the files whose content changed are moved into place, atomically, when the generator commits, so unchanged files
+    keep their modification times (and MSBuild keeps its incremental build) and an interrupted run never leaves a
+    half written file behind. Folders are created once per run.
+
+    Files are encoded as ENCODING, with the newlines of the platform like open(path, 'w') would write them.
+    """
+
+    # incremental runs keep their manifests next to the outputs
+    supports_manifest = True
+    # the per-model files may be written in any order
+    sequential = False
+
+    def __init__(self, encoding: str = None, newline: str = None):
+        self.encoding = encoding or ENCODING
+        self.newline = os.linesep if newline is None else newline
+        self._lock = threading.Lock()
+        self._created_dirs = set()
+        self._staged = []
+        self._removed = []
+
+    def encode(self, content: str) -> bytes:
+        if self.newline != '\n':
+            content = content.replace('\n', self.newline)
+        return content.encode(self.encoding)
+
+    def ensure_dir(self, path: str):
+        """
+        Creates the folder (but not its parents, they are the output roots) unless it was already done this run.
+        """
+        if path in self._created_dirs:
+            return
+        if not os.path.isdir(path):
+            os.mkdir(path)
+        with self._lock:
+            self._created_dirs.add(path)
+
+    def write(self, path: str, content: str) -> bool:
+        """
+        Stages the content for path. Returns False (and stages nothing) if the file already has this content.
+        """
+        data = self.encode(content)
+        try:
+            if os.path.getsize(path) == len(data):
+                with open(path, 'rb') as existing:
+                    if existing.read() == data:
+                        return False
+        except FileNotFoundError:
+            pass
+
+        folder, name = os.path.split(path)
+        staging_path = os.path.join(folder, f'.{name}.{os.getpid()}-{threading.get_ident()}.staged')
+        with open(staging_path, 'wb') as staging_file:
+            staging_file.write(data)
+        with self._lock:
+            self._staged.append((staging_path, path))
+        return True
+
+    def remove(self, path: str):
+        """
+        Deletes a file the generator doesn't write anymore, when it commits.
+        """
+        with self._lock:
+            self._removed.append(path)
+
+    def commit(self):
+        """
+        Moves every staged file into place and deletes the removed ones.
+        """
+        with self._lock:
+            staged, self._staged = self._staged, []
+            removed, self._removed = self._removed, []
+        for staging_path, path in staged:
+            os.replace(staging_path, path)
+        for path in removed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def discard(self):
+        """
+        Drops the staged files and removals, leaving the outputs as they were.
+        """
+        with self._lock:
+            staged, self._staged = self._staged, []
+            self._removed = []
+        for staging_path, _ in staged:
+            try:
+                os.remove(staging_path)
+            except FileNotFoundError:
+                pass
+
+
+class MemoryOutput:
+    """
+    Keeps the generated files in memory (path -> content) instead of writing them, for dry runs. The files a run
+    would delete are collected in removed.
+    """
+
+    supports_manifest = False
+    sequential = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files = {}
+        self.removed = set()
+
+    def ensure_dir(self, path: str):
+        pass
+
+    def write(self, path: str, content: str) -> bool:
+        with self._lock:
+            self.files[path] = content
+        return True
+
+    def remove(self, path: str):
+        with self._lock:
+            self.removed.add(path)
+
+    def commit(self):
+        pass
+
+    def discard(self):
+        pass
+
+
+def archive_format(archive_path: str) -> str:
+    """
+    Returns the format (zip, tar, gz, bz2 or xz) of an archive by its extension, or raises ValueError.
+    """
+    name = archive_path.lower()
+    for extension, archive_type in ARCHIVE_FORMATS.items():
+        if name.endswith(extension):
+            return archive_type
+    raise ValueError(f"unknown archive format: {archive_path} (use {', '.join(ARCHIVE_FORMATS)})")
+
+
+class ArchiveOutput:
+    """
+    Streams the generated files into one zip or tar archive instead of writing them one by one.
+
+    The members are named by their path relative to root_dir, so the archive has the same schema folder layout as
+    the output roots. Every file is added as soon as it is written, so only one file is held in memory at a time.
+    The per-model files are written one after the other in catalog order (sequential) and every member gets the same
+    timestamp (SOURCE_DATE_EPOCH if set), so the same inputs always give a byte for byte identical archive.
+
+    Files are encoded like FileSystemOutput does, so a member has the same bytes as the file a run writes to disk.
+    Members can't be taken back, so an archive whose run failed is deleted when it is closed.
+
+    The format follows the extension of archive_path: .zip, .tar, .tar.gz (or .tgz), .tar.bz2 or .tar.xz.
+    """
+
+    supports_manifest = False
+    # members are appended in the order they are written, so the per-model files are not written on a thread pool
+    sequential = True
+
+    # zip can't store dates before 1980
+    _ZIP_EPOCH = 315532800
+
+    def __init__(self, archive_path: str, root_dir: str, compression: bool = True, compress_level: int = None,
+                 encoding: str = None, newline: str = None):
+        # the codecs are only imported by runs that write an archive
+        import bz2
+        import gzip
+        import lzma
+        import tarfile
+        import zipfile
+
+        # checked before the archive is created, so a bad extension leaves no empty file behind
+        archive_type = archive_format(archive_path)
+        self.archive_path = archive_path
+        self.root_dir = root_dir
+        self.encoding = encoding or ENCODING
+        self.newline = os.linesep if newline is None else newline
+        self.timestamp = int(os.environ.get('SOURCE_DATE_EPOCH', 0))
+        self._lock = threading.Lock()
+        self._names = set()
+        self._file = open(archive_path, 'wb')
+        self._compressor = None
+        if archive_type == 'zip':
+            self._zip = zipfile.ZipFile(self._file, 'w', zipfile.ZIP_DEFLATED if compression else zipfile.ZIP_STORED,
+                                        compresslevel=compress_level)
+            self._tar = None
+        else:
+            self._zip = None
+            fileobj = self._file
+            if archive_type == 'gz' and compression:
+                # gzip.open would put the current time and the file name in the header
+                self._compressor = gzip.GzipFile('', 'wb', 9 if compress_level is None else compress_level,
+                                                 self._file, mtime=self.timestamp)
+                fileobj = self._compressor
+            elif archive_type == 'bz2' and compression:
+                self._compressor = bz2.BZ2File(self._file, 'wb', compresslevel=compress_level or 9)
+                fileobj = self._compressor
+            elif archive_type == 'xz' and compression:
+                self._compressor = lzma.LZMAFile(self._file, 'wb', preset=compress_level)
+                fileobj = self._compressor
+            self._tar = tarfile.open(fileobj=fileobj, mode='w', format=tarfile.PAX_FORMAT)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        self.close()
+        if exc_type is not None:
+            os.remove(self.archive_path)
+
+    def member_name(self, path: str) -> str:
+        relative_path = os.path.relpath(path, self.root_dir)
+        if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+            raise ValueError(f"{path} is outside of the archive root {self.root_dir}")
+        return relative_path.replace(os.sep, '/')
+
+    def ensure_dir(self, path: str):
+        pass
+
+    def write(self, path: str, content: str) -> bool:
+        import tarfile
+        import zipfile
+
+        name = self.member_name(path)
+        if self.newline != '\n':
+            content = content.replace('\n', self.newline)
+        data = content.encode(self.encoding)
+        with self._lock:
+            if name in self._names:
+                raise ValueError(f"{name} was generated twice")
+            self._names.add(name)
+            if self._zip is not None:
+                info = zipfile.ZipInfo(name, time.gmtime(max(self.timestamp, self._ZIP_EPOCH))[:6])
+                info.compress_type = self._zip.compression
+                info.external_attr = 0o644 << 16
+                self._zip.writestr(info, data)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = self.timestamp
+                info.mode = 0o644
+                self._tar.addfile(info, io.BytesIO(data))
+        return True
+
+    def remove(self, path: str):
+        # the archive only ever holds the files of this run
+        pass
+
+    def commit(self):
+        pass
+
+    def discard(self):
+        pass
+
+    def close(self):
+        """
+        Finishes the archive.
+        """
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
+            if self._compressor is not None:
+                self._compressor.close()
+        self._file.close()
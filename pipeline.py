@@ -0,0 +1,178 @@
+"""
+Runs discovery, schema resolution, rendering and writing as an asyncio pipeline, so slow schema lookups and slow
+writes (e.g. to a network share) overlap instead of adding up:
+
+    entity files -> [paths] -> schema + parse -> [models] -> render -> [files] -> write
+
+The stages are connected by bounded queues, so a fast stage waits for room instead of piling up work, and memory
+stays flat however big the model folder is. Only the models themselves are kept until the end, the aggregates
+(managers and mapping profile) are rendered from them once every per-model file is written.
+
+Every file is rendered (there is no incremental mode), the output only replaces the files whose content changed.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from Automate import GENERATORS, PER_MODEL_FILES, PER_MODEL_GENERATORS
+from catalog import ModelCatalog, iter_model_files, load_model
+from database import load_schema_map
+from output import FileSystemOutput
+from run_stats import get_stats
+
+# how many paths the discovery thread hands over at once
+_DISCOVERY_BATCH = 64
+
+
+async def _discover(model_path_dir: str, paths: asyncio.Queue, resolvers: int, executor):
+    # os.walk blocks, so it is advanced on a thread a batch at a time
+    loop = asyncio.get_running_loop()
+    source_paths = iter_model_files(model_path_dir)
+    while True:
+        batch = await loop.run_in_executor(executor, lambda: list(islice(source_paths, _DISCOVERY_BATCH)))
+        if not batch:
+            break
+        for source_path in batch:
+            await paths.put(source_path)
+    for _ in range(resolvers):
+        await paths.put(None)
+
+
+async def _resolve(paths: asyncio.Queue, models: asyncio.Queue, missing: list, schema_map_loaded, executor):
+    loop = asyncio.get_running_loop()
+    # the first lookup loads the schema map, the others wait for it instead of each querying the database
+    await schema_map_loaded
+    while True:
+        source_path = await paths.get()
+        if source_path is None:
+            return
+        model = await loop.run_in_executor(executor, load_model, source_path)
+        if model is None:
+            missing.append(os.path.splitext(os.path.basename(source_path))[0])
+        else:
+            await models.put(model)
+
+
+async def _render(models: asyncio.Queue, files: asyncio.Queue, writers: int, per_model: dict, collected: list,
+                  output):
+    stats = get_stats()
+    while True:
+        model = await models.get()
+        if model is None:
+            break
+        collected.append(model)
+        for key, (root_dir, file_name, render) in per_model.items():
+            schema_dir = os.path.join(root_dir, model.schema)
+            output.ensure_dir(schema_dir)
+            start = time.perf_counter()
+            content = render(model)
+            seconds = time.perf_counter() - start
+            stats.add_time('render', seconds, key)
+            await files.put((key, model.name, os.path.join(schema_dir, file_name(model)), content, seconds))
+    for _ in range(writers):
+        await files.put(None)
+
+
+async def _write(files: asyncio.Queue, output, executor):
+    loop = asyncio.get_running_loop()
+    stats = get_stats()
+    while True:
+        item = await files.get()
+        if item is None:
+            return
+        key, model_name, output_path, content, render_seconds = item
+        start = time.perf_counter()
+        changed = await loop.run_in_executor(executor, output.write, output_path, content)
+        seconds = time.perf_counter() - start
+        stats.add_time('write', seconds, key)
+        stats.record_model(key, model_name, render_seconds + seconds)
+        if changed:
+            stats.count('files_written')
+            stats.count('bytes_written', len(content.encode('utf-8')))
+        else:
+            stats.count('files_unchanged')
+
+
+async def generate_pipelined(model_path_dir: str, targets: dict, only: list = None, output=None, queue_size: int = 64,
+                             schema_concurrency: int = 4, write_workers: int = 8) -> ModelCatalog:
+    """
+    Runs the selected generators like generate_all, with the stages of every model overlapping.
+
+    Args:
+    model_path_dir (str): The directory of the scaffolded entity files.
+    targets (dict): Generator key (see GENERATORS) -> the output root (or file, for managers and mapping) of it.
+    only (list): The generator keys to run. Defaults to every generator that has a target.
+    output (FileSystemOutput): Where the files are written to. Defaults to the file system.
+    queue_size (int): How many items each queue holds before the stage feeding it waits.
+    schema_concurrency (int): How many entity files have their schema resolved and are parsed at the same time.
+    write_workers (int): How many files are written at the same time.
+
+    Returns:
+    ModelCatalog: The catalog of the models the generators ran over.
+    """
+    selected = only if only is not None else list(targets)
+    unknown = [key for key in selected if key not in GENERATORS]
+    if unknown:
+        raise ValueError(f"unknown generators: {', '.join(unknown)}")
+
+    stats = get_stats()
+    output = output or FileSystemOutput()
+    loop = asyncio.get_running_loop()
+    per_model = {}
+    for key in PER_MODEL_GENERATORS:
+        if key in selected:
+            file_name, render, _ = PER_MODEL_FILES[key]()
+            per_model[key] = (targets[key], file_name, render)
+
+    paths = asyncio.Queue(queue_size)
+    models = asyncio.Queue(queue_size)
+    files = asyncio.Queue(queue_size)
+    collected = []
+    missing = []
+    try:
+        with ThreadPoolExecutor(schema_concurrency) as schema_executor, \
+                ThreadPoolExecutor(write_workers) as write_executor:
+            schema_map_loaded = loop.run_in_executor(schema_executor, load_schema_map)
+
+            async def resolve_all():
+                await asyncio.gather(*[_resolve(paths, models, missing, schema_map_loaded, schema_executor)
+                                       for _ in range(schema_concurrency)])
+                await models.put(None)
+
+            tasks = [asyncio.ensure_future(_discover(model_path_dir, paths, schema_concurrency, schema_executor)),
+                     asyncio.ensure_future(resolve_all()),
+                     asyncio.ensure_future(_render(models, files, write_workers, per_model, collected, output))]
+            tasks += [asyncio.ensure_future(_write(files, output, write_executor)) for _ in range(write_workers)]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+    except BaseException:
+        # the executors are shut down by now, so no write can stage a file after this
+        output.discard()
+        raise
+    with stats.timer('commit', 'pipeline'):
+        output.commit()
+
+    catalog = ModelCatalog(model_path_dir, collected, missing)
+    catalog.sort()
+    stats.count('models', len(catalog))
+    stats.count('models_missing', len(missing))
+    for key, generator in GENERATORS.items():
+        if key in selected and key not in PER_MODEL_GENERATORS:
+            with stats.timer('total', key):
+                generator(catalog, targets[key], output=output)
+    return catalog
+
+
+def run_pipeline(model_path_dir: str, targets: dict, only: list = None, **options) -> ModelCatalog:
+    """
+    Runs generate_pipelined to completion, see it for the options.
+    """
+    with get_stats().timer('total', 'pipeline'):
+        return asyncio.run(generate_pipelined(model_path_dir, targets, only, **options))
@@ -0,0 +1,105 @@
+"""
+Counters and timers of a generation run, so a slow run shows where the time went.
+
+Timings are kept per generator and per stage (discovery, schema, render, write). Render and write times of the
+per-model generators are summed over the models, so with workers they can add up to more than the wall time.
+"""
+import cProfile
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# the stats of the run in progress, see get_stats and reset_stats
+_current = None
+
+
+class RunStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        # generator -> stage -> seconds
+        self.timings = {}
+        # counter name -> value, e.g. db_queries, files_written, bytes_written
+        self.counters = {}
+        # (generator, model name) -> seconds spent rendering and writing it
+        self.model_timings = {}
+
+    @contextmanager
+    def timer(self, stage: str, generator: str = 'run'):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start, generator)
+
+    def add_time(self, stage: str, seconds: float, generator: str = 'run'):
+        with self._lock:
+            stages = self.timings.setdefault(generator, {})
+            stages[stage] = stages.get(stage, 0) + seconds
+
+    def count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def record_model(self, generator: str, model_name: str, seconds: float):
+        with self._lock:
+            self.model_timings[(generator, model_name)] = seconds
+
+    def summary(self, slowest: int = 10) -> dict:
+        """
+        A json-serializable summary of the run: elapsed time, timings, counters and the slowest models.
+        """
+        with self._lock:
+            slowest_models = sorted(self.model_timings.items(), key=lambda item: item[1], reverse=True)[:slowest]
+            return {
+                'elapsed': round(time.perf_counter() - self.started, 4),
+                'timings': {generator: {stage: round(seconds, 4) for stage, seconds in stages.items()}
+                            for generator, stages in self.timings.items()},
+                'counters': dict(self.counters),
+                'slowest_models': [{'generator': generator, 'model': model_name, 'seconds': round(seconds, 4)}
+                                   for (generator, model_name), seconds in slowest_models],
+            }
+
+    def save(self, path: str, slowest: int = 10):
+        with open(path, 'w+') as stats_file:
+            json.dump(self.summary(slowest), stats_file, indent=1)
+
+
+def get_stats() -> RunStats:
+    global _current
+    if _current is None:
+        _current = RunStats()
+    return _current
+
+
+def reset_stats() -> RunStats:
+    """
+    Starts a new set of stats, e.g. at the beginning of a run.
+    """
+    global _current
+    _current = RunStats()
+    return _current
+
+
+@contextmanager
+def profiling(cprofile_path: str = None, trace_memory: bool = False):
+    """
+    Profiles the enclosed code with cProfile (saved to cprofile_path, readable with pstats) and/or traces its peak
+    memory with tracemalloc, which ends up in the peak_memory counter of the run stats.
+    """
+    profiler = cProfile.Profile() if cprofile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+        if trace_memory:
+            get_stats().count('peak_memory', tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
@@ -0,0 +1,88 @@
+import os
+import re
+
+import cs_templates
+
+# placeholders are written {{NAME}} so they can't be mistaken for C# code or for each other
+_placeholder_pattern = re.compile(r'\{\{([A-Z][A-Z0-9_]*)\}\}')
+
+TEMPLATE_EXTENSION = '.cs.tpl'
+
+# directory checked for <name>.cs.tpl files overriding the built in templates, see set_template_dir
+_template_dir = os.environ.get('CNET_TEMPLATE_DIR')
+
+# template name -> compiled template, so every template is compiled once per process
+_compiled = {}
+
+
+class Template:
+    """
+    A template compiled once into its literal text segments and {{NAME}} placeholders.
+
+    render fills all placeholders in a single pass, so the values never get scanned for other placeholders and the
+    order the values are given in doesn't matter.
+    """
+
+    def __init__(self, source: str, name: str = ''):
+        self.source = source
+        self.name = name
+        self.segments = []
+        position = 0
+        for match in _placeholder_pattern.finditer(source):
+            self.segments.append(source[position:match.start()])
+            self.segments.append(match.group(1))
+            position = match.end()
+        self.segments.append(source[position:])
+        # literals are at the even indexes, placeholder names at the odd ones
+        self.placeholders = set(self.segments[1::2])
+
+    def render(self, values: dict = None, **kwargs) -> str:
+        if kwargs:
+            values = {**(values or {}), **kwargs}
+        segments = self.segments[:]
+        try:
+            for i in range(1, len(segments), 2):
+                segments[i] = values[segments[i]]
+        except KeyError as e:
+            raise KeyError(f"no value for placeholder {e.args[0]} of template {self.name or '<inline>'}") from None
+        return ''.join(segments)
+
+
+def set_template_dir(template_dir: str):
+    """
+    Makes get_template prefer <template_dir>/<name>.cs.tpl over the built in templates. None uses the built in ones.
+    """
+    global _template_dir
+    _template_dir = template_dir
+    _compiled.clear()
+
+
+def load_template(path: str) -> Template:
+    """
+    Compiles the template stored in the given file.
+    """
+    with open(path, newline='') as template_file:
+        return Template(template_file.read(), os.path.basename(path))
+
+
+def get_template(name: str) -> Template:
+    """
+    Returns the compiled template of the given name, from the template directory if it overrides it.
+    """
+    if name not in _compiled:
+        path = os.path.join(_template_dir, name + TEMPLATE_EXTENSION) if _template_dir else None
+        if path and os.path.exists(path):
+            _compiled[name] = load_template(path)
+        else:
+            _compiled[name] = Template(cs_templates.TEMPLATES[name], name)
+    return _compiled[name]
+
+
+def export_templates(template_dir: str):
+    """
+    Writes the built in templates to template_dir, as a starting point for overriding them.
+    """
+    os.makedirs(template_dir, exist_ok=True)
+    for name, source in cs_templates.TEMPLATES.items():
+        with open(os.path.join(template_dir, name + TEMPLATE_EXTENSION), 'w+', newline='') as template_file:
+            template_file.write(source)
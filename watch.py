@@ -0,0 +1,252 @@
+"""
+Watches the model directory and regenerates only what the changed entities affect.
+
+The catalog, the schema map and the parsed entities stay in memory between regenerations. The schema map is reloaded
+when the DbContext changes, or when a changed entity can't be resolved (e.g. a table that was just added), so new
+entities are picked up without a restart. On Linux changes are picked up with inotify, elsewhere (or if inotify is
+unavailable) the directory is polled.
+
+    python watch.py
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from Automate import GENERATORS, PER_MODEL_GENERATORS, generate_all
+from catalog import ModelCatalog
+from database import find_schema, reload_schemas
+from run_stats import reset_stats
+
+# inotify event masks, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class PollingWatcher:
+    """
+    Detects changed entity files by comparing their modification times and sizes every interval seconds.
+
+    The extra_files outside of the model directory (e.g. the DbContext) are watched too.
+    """
+
+    def __init__(self, model_path_dir: str, interval: float = 1.0, extra_files=()):
+        self.model_path_dir = model_path_dir
+        self.interval = interval
+        self.extra_files = list(extra_files)
+        self._files = self._scan()
+
+    def _scan(self) -> dict:
+        paths = list(self.extra_files)
+        for root, dirs, names in os.walk(self.model_path_dir):
+            paths.extend(os.path.join(root, name) for name in names if name.endswith('.cs'))
+        files = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def changes(self, timeout: float = None) -> set:
+        """
+        Returns the paths that changed, waiting up to timeout seconds (forever if None) for the first change.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            files = self._scan()
+            changed = {path for path in files.keys() | self._files.keys() if files.get(path) != self._files.get(path)}
+            self._files = files
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else max(0.0, min(self.interval, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Detects changed entity files with inotify, watching the model directory and all its sub folders.
+
+    The extra_files outside of the model directory (e.g. the DbContext) are watched through their folders, whose
+    other files are ignored.
+    """
+
+    def __init__(self, model_path_dir: str, extra_files=()):
+        self.model_path_dir = model_path_dir
+        self.extra_files = set(extra_files)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._folders = {}
+        # the folders that are only watched for extra_files
+        self._extra_folders = set()
+        for root, dirs, names in os.walk(model_path_dir):
+            self._add_watch(root)
+        model_folders = set(self._folders)
+        for path in self.extra_files:
+            descriptor = self._add_watch(os.path.dirname(path))
+            if descriptor not in model_folders:
+                self._extra_folders.add(descriptor)
+
+    def _add_watch(self, folder: str) -> int:
+        descriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), _WATCH_MASK)
+        if descriptor < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {folder}')
+        self._folders.setdefault(descriptor, folder)
+        return descriptor
+
+    def _add_folder(self, folder: str) -> set:
+        # files written (or moved in) before the watch was added raise no event, so they are picked up by a scan
+        existing = set()
+        for root, dirs, names in os.walk(folder):
+            self._add_watch(root)
+            existing.update(os.path.join(root, name) for name in names if name.endswith('.cs'))
+        return existing
+
+    def changes(self, timeout: float = None) -> set:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            folder = self._folders.get(descriptor)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, name)
+            if descriptor in self._extra_folders:
+                if path in self.extra_files:
+                    changed.add(path)
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed |= self._add_folder(path)
+                continue
+            if name.endswith('.cs') or path in self.extra_files:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+def make_watcher(model_path_dir: str, poll_interval: float = 1.0, use_inotify: bool = True, extra_files=()):
+    """
+    Returns an inotify watcher where it is available, and a polling one otherwise.
+    """
+    if use_inotify and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(model_path_dir, extra_files)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(model_path_dir, poll_interval, extra_files)
+
+
+def wait_for_changes(watcher, debounce: float = 0.5) -> set:
+    """
+    Waits for a change, then keeps collecting until nothing changed for debounce seconds, so a re-scaffold of many
+    entities ends up in one regeneration.
+    """
+    changed = set()
+    while not changed:
+        changed = watcher.changes(None)
+    while True:
+        more = watcher.changes(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+def regenerate_changed(catalog: ModelCatalog, source_paths, targets: dict, only: list = None, workers: int = 0,
+                       schemas_changed: bool = False):
+    """
+    Updates the catalog with the changed entity files and regenerates what they affect.
+
+    If schemas_changed (the DbContext was edited) or a changed entity can't be resolved, the schema map is reloaded
+    first, and the missing models and the models whose schema changed are loaded again along with the changed files.
+
+    Per-model files are rendered only for the added and changed entities. The aggregates (managers and mapping
+    profile) are rendered from the warm catalog, and their manifest keeps them untouched unless a model was added,
+    removed or moved to another schema.
+    """
+    source_paths = set(source_paths)
+    if not schemas_changed:
+        schemas_changed = any(find_schema(os.path.splitext(os.path.basename(source_path))[0]) == -1
+                              for source_path in source_paths if os.path.exists(source_path))
+    if schemas_changed:
+        reload_schemas()
+        source_paths.update(catalog.stale_schema_paths())
+    changed, removed = catalog.update(source_paths)
+    if not changed and not removed:
+        return changed, removed
+    selected = only if only is not None else list(targets)
+    changed_catalog = catalog.subset(names=changed)
+    for key, generator in GENERATORS.items():
+        if key not in selected:
+            continue
+        if key in PER_MODEL_GENERATORS:
+            if len(changed_catalog):
+                generator(changed_catalog, targets[key], incremental=True, workers=workers)
+        else:
+            generator(catalog, targets[key], incremental=True)
+    for model_name in removed:
+        print(f"{model_name} was removed, its generated files were left in place")
+    return changed, removed
+
+
+def watch(model_path_dir: str, targets: dict, only: list = None, workers: int = 0, debounce: float = 0.5,
+          poll_interval: float = 1.0, use_inotify: bool = True, db_context_path: str = None):
+    """
+    Generates everything once, then regenerates the affected files whenever entity files change, until interrupted.
+
+    If the schemas are read from a DbContext, pass its db_context_path so that editing it reloads them.
+    """
+    catalog = generate_all(model_path_dir, targets, only, incremental=True, workers=workers)
+    extra_files = [os.path.abspath(db_context_path)] if db_context_path else []
+    watcher = make_watcher(model_path_dir, poll_interval, use_inotify, extra_files)
+    print(f"watching {model_path_dir} ({type(watcher).__name__}), press Ctrl+C to stop")
+    try:
+        while True:
+            source_paths = wait_for_changes(watcher, debounce)
+            schemas_changed = any(path in source_paths for path in extra_files)
+            source_paths.difference_update(extra_files)
+            stats = reset_stats()
+            changed, removed = regenerate_changed(catalog, source_paths, targets, only, workers, schemas_changed)
+            summary = stats.summary()
+            print(f"{len(changed)} changed, {len(removed)} removed: {summary['counters'].get('files_written', 0)} "
+                  f"files written in {summary['elapsed'] * 1000:.0f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    import main
+
+    main.configure()
+    watch(main.model_path, main.targets, main.selected_generators, main.generation_workers,
+          db_context_path=main.db_context_path)